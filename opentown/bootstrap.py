@@ -0,0 +1,219 @@
+"""Worktree bootstrap - shared dependency cache across engineer worktrees."""
+
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+from .persistence import load_json, get_town, Town
+
+# Each recipe maps lockfiles to the dependency directories they produce.
+# mode "clone" builds in the first worktree and copies the result into the
+# cache and later worktrees (copy-on-write where the filesystem supports it).
+# mode "venv" builds in every worktree, so each engineer owns its virtualenv
+# and can pip install or uv add without changing anyone else's; only the
+# package manager's download/wheel cache is shared, at $OT_PKG_CACHE.
+DEFAULT_RECIPES = [
+    {
+        "name": "npm",
+        "lockfiles": ["package-lock.json"],
+        "dirs": ["node_modules"],
+        "command": "npm ci",
+        "mode": "clone",
+    },
+    {
+        "name": "yarn",
+        "lockfiles": ["yarn.lock"],
+        "dirs": ["node_modules"],
+        "command": "yarn install --frozen-lockfile",
+        "mode": "clone",
+    },
+    {
+        "name": "pnpm",
+        "lockfiles": ["pnpm-lock.yaml"],
+        "dirs": ["node_modules"],
+        "command": "pnpm install --frozen-lockfile",
+        "mode": "clone",
+    },
+    {
+        "name": "uv",
+        "lockfiles": ["uv.lock"],
+        "dirs": [".venv"],
+        "command": 'UV_CACHE_DIR="$OT_PKG_CACHE" uv sync --frozen',
+        "mode": "venv",
+    },
+    {
+        "name": "poetry",
+        "lockfiles": ["poetry.lock"],
+        "dirs": [".venv"],
+        "command": (
+            "python -m venv .venv && "
+            'POETRY_CACHE_DIR="$OT_PKG_CACHE" VIRTUAL_ENV="$PWD/.venv" '
+            'PATH="$PWD/.venv/bin:$PATH" poetry install --no-root'
+        ),
+        "mode": "venv",
+    },
+    {
+        "name": "pip",
+        "lockfiles": ["requirements.txt"],
+        "dirs": [".venv"],
+        "command": (
+            "python -m venv .venv && "
+            'PIP_CACHE_DIR="$OT_PKG_CACHE" .venv/bin/pip install -q -r requirements.txt'
+        ),
+        "mode": "venv",
+    },
+]
+
+CACHE_KEEP = 3
+
+
+def get_cache_dir(town: Town = None) -> Path:
+    """Get the dependency cache directory."""
+    return get_town(town).path / "cache"
+
+
+def load_recipes(town: Town = None) -> list:
+    """Load bootstrap recipes from .town/bootstrap.json, or the defaults."""
+    config = load_json(get_town(town).path / "bootstrap.json")
+    if config and "recipes" in config:
+        return config["recipes"]
+    return DEFAULT_RECIPES
+
+
+def lockfile_hash(worktree_path: Path, recipe: dict) -> str:
+    """Hash the recipe's lockfiles present in the worktree (None if none exist)."""
+    digest = hashlib.sha256(recipe["name"].encode())
+    found = False
+    for name in recipe["lockfiles"]:
+        path = worktree_path / name
+        if path.exists():
+            found = True
+            digest.update(name.encode() + b"\0")
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16] if found else None
+
+
+def clone_tree(src: Path, dest: Path) -> None:
+    """Copy a directory tree, using copy-on-write clones when available."""
+    if sys.platform == "darwin":
+        cmd = ["cp", "-Rc", str(src), str(dest)]
+    else:
+        cmd = ["cp", "-a", "--reflink=auto", str(src), str(dest)]
+
+    result = subprocess.run(cmd, capture_output=True)
+    if result.returncode != 0:
+        shutil.rmtree(dest, ignore_errors=True)
+        shutil.copytree(src, dest, symlinks=True)
+
+
+def materialize(entry: Path, worktree_path: Path, recipe: dict) -> list:
+    """Clone cached directories into a worktree."""
+    placed = []
+    for name in recipe["dirs"]:
+        src = entry / name
+        dest = worktree_path / name
+        if not src.exists() or dest.exists() or dest.is_symlink():
+            continue
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        clone_tree(src, dest)
+        placed.append(name)
+    return placed
+
+
+def populate(entry: Path, worktree_path: Path, recipe: dict) -> bool:
+    """Store freshly built dependency directories in the cache."""
+    staging = entry.with_name(f".{entry.name}.{os.getpid()}.tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    stored = False
+    for name in recipe["dirs"]:
+        src = worktree_path / name
+        if src.is_dir() and not src.is_symlink():
+            (staging / name).parent.mkdir(parents=True, exist_ok=True)
+            clone_tree(src, staging / name)
+            stored = True
+
+    if not stored:
+        shutil.rmtree(staging, ignore_errors=True)
+        return False
+
+    try:
+        os.rename(staging, entry)
+    except OSError:
+        # Another bootstrap filled the same key first.
+        shutil.rmtree(staging, ignore_errors=True)
+    return True
+
+
+def build_venv(worktree_path: Path, recipe: dict, pkg_cache: Path) -> str:
+    """Build a venv-mode recipe in the worktree against the shared package cache."""
+    if all((worktree_path / name).is_dir() for name in recipe["dirs"]):
+        return "hit"
+    pkg_cache.mkdir(parents=True, exist_ok=True)
+    result = subprocess.run(
+        recipe["command"],
+        shell=True,
+        cwd=worktree_path,
+        capture_output=True,
+        env={**os.environ, "OT_PKG_CACHE": str(pkg_cache.resolve())},
+    )
+    if result.returncode != 0:
+        for name in recipe["dirs"]:
+            shutil.rmtree(worktree_path / name, ignore_errors=True)
+        return "failed"
+    return "built"
+
+
+def prune_cache(recipe_dir: Path, keep: int = CACHE_KEEP) -> None:
+    """Drop all but the most recently used cache entries for a recipe."""
+    entries = [p for p in recipe_dir.iterdir() if p.is_dir() and not p.name.startswith(".")]
+    entries.sort(key=lambda p: p.stat().st_mtime, reverse=True)
+    for stale in entries[keep:]:
+        shutil.rmtree(stale, ignore_errors=True)
+
+
+def bootstrap_worktree(worktree_path: Path, town: Town = None) -> dict:
+    """Provision dependency directories in a worktree from the shared cache.
+
+    Cached directories are reused while the lockfile hash is unchanged; the
+    install command only runs on a cache miss. venv recipes always install
+    into the worktree, sharing only the package cache. Returns a
+    {recipe: outcome} report where outcome is "hit", "built" or "failed".
+    """
+    worktree_path = Path(worktree_path)
+    report = {}
+
+    for recipe in load_recipes(town):
+        key = lockfile_hash(worktree_path, recipe)
+        if not key:
+            continue
+
+        recipe_dir = get_cache_dir(town) / recipe["name"]
+        entry = recipe_dir / key
+
+        if recipe.get("mode") == "venv":
+            report[recipe["name"]] = build_venv(worktree_path, recipe, recipe_dir)
+            continue
+
+        if entry.is_dir():
+            os.utime(entry)
+            materialize(entry, worktree_path, recipe)
+            report[recipe["name"]] = "hit"
+            continue
+
+        result = subprocess.run(
+            recipe["command"], shell=True, cwd=worktree_path, capture_output=True
+        )
+        if result.returncode != 0:
+            report[recipe["name"]] = "failed"
+            continue
+
+        recipe_dir.mkdir(parents=True, exist_ok=True)
+        populate(entry, worktree_path, recipe)
+        prune_cache(recipe_dir)
+        report[recipe["name"]] = "built"
+
+    return report
@@ -0,0 +1,226 @@
+"""Job broker - hands engineer jobs to worker agents over HTTP.
+
+Jobs live in .town/jobs.json guarded by an flock, so `ot spawn` can queue
+jobs while `ot broker serve` hands them out. A worker claims a job, sends
+heartbeats to keep its lease, pushes the branch to .town/remote.git and
+reports back; the broker fetches the branch and marks the engineer done.
+Jobs whose lease lapses go back to the queue.
+
+Protocol (JSON bodies, POST unless noted):
+  /claim      {"worker"}                          -> 200 job, 204 if none
+  /heartbeat  {"job", "worker"}                   -> 200, 409 if lease lost
+  /finish     {"job", "worker", "status", "sha"}  -> 200, 409 if lease lost
+  GET /jobs                                       -> 200 {id: job}
+"""
+
+import fcntl
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from .persistence import update_engineer_status, get_town, Town
+
+LEASE_TTL = 120  # seconds without a heartbeat before a job is requeued
+MAX_ATTEMPTS = 3
+
+
+class BrokerServer(ThreadingHTTPServer):
+    """Threaded HTTP server for many polling workers."""
+
+    request_queue_size = 128
+    daemon_threads = True
+
+
+@contextmanager
+def locked_jobs(town: Town = None):
+    """Load jobs.json under an exclusive lock and save it on exit."""
+    root = get_town(town).path
+    root.mkdir(parents=True, exist_ok=True)
+    jobs_path = root / "jobs.json"
+
+    with open(root / "jobs.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            data = json.loads(jobs_path.read_text()) if jobs_path.exists() else {}
+            data.setdefault("jobs", {})
+            data.setdefault("port", None)
+            yield data
+            tmp = jobs_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(data, indent=2))
+            tmp.replace(jobs_path)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def add_job(job: dict, town: Town = None) -> dict:
+    """Queue a job for an engineer, replacing any earlier one."""
+    job = {
+        **job,
+        "id": job["engineer"],
+        "status": "queued",
+        "worker": None,
+        "lease_expires": None,
+        "attempts": 0,
+        "sha": None,
+        "lease_ttl": LEASE_TTL,
+    }
+    with locked_jobs(town) as data:
+        data["jobs"][job["id"]] = job
+    return job
+
+
+def expire_leases(data: dict, now: float) -> None:
+    """Requeue claimed jobs whose worker stopped sending heartbeats."""
+    for job in data["jobs"].values():
+        if job["status"] == "claimed" and job["lease_expires"] < now:
+            job.update(status="queued", worker=None, lease_expires=None)
+
+
+def claim_job(worker: str, town: Town = None) -> Optional[dict]:
+    """Lease the oldest queued job to a worker. Returns None if none."""
+    with locked_jobs(town) as data:
+        now = time.time()
+        expire_leases(data, now)
+        for job in data["jobs"].values():
+            if job["status"] == "queued":
+                job.update(
+                    status="claimed",
+                    worker=worker,
+                    lease_expires=now + LEASE_TTL,
+                    attempts=job["attempts"] + 1,
+                )
+                return dict(job)
+    return None
+
+
+def heartbeat(job_id: str, worker: str, town: Town = None) -> bool:
+    """Extend a worker's lease. Returns False if the lease was lost."""
+    with locked_jobs(town) as data:
+        job = data["jobs"].get(job_id)
+        if not job or job["status"] != "claimed" or job["worker"] != worker:
+            return False
+        job["lease_expires"] = time.time() + LEASE_TTL
+        return True
+
+
+def finish_job(
+    job_id: str, worker: str, status: str, sha: str = None, town: Town = None
+) -> bool:
+    """Record a worker's result. Returns False if the lease was lost.
+
+    A successful job's branch is fetched into the project and its engineer
+    marked done. A failed job is requeued until it runs out of attempts.
+    """
+    from .executors import WorkerExecutor
+
+    town = get_town(town)
+    with locked_jobs(town) as data:
+        job = data["jobs"].get(job_id)
+        if not job or job["status"] != "claimed" or job["worker"] != worker:
+            return False
+        if status == "done":
+            job.update(status="done", sha=sha, lease_expires=None)
+        elif job["attempts"] < MAX_ATTEMPTS:
+            job.update(status="queued", worker=None, lease_expires=None)
+        else:
+            job.update(status="failed", lease_expires=None)
+        job = dict(job)
+
+    if job["status"] == "done":
+        engineer = {"id": job["engineer"], "branch": job["branch"]}
+        fetched = WorkerExecutor(town).collect(engineer)
+        status = "done" if fetched else "failed"
+        update_engineer_status(job["engineer"], status, town=town)
+    elif job["status"] == "failed":
+        update_engineer_status(job["engineer"], "failed", town=town)
+    return True
+
+
+def cancel_job(job_id: str, town: Town = None) -> None:
+    """Drop a job so no worker picks it up."""
+    with locked_jobs(town) as data:
+        data["jobs"].pop(job_id, None)
+
+
+def get_jobs(town: Town = None) -> dict:
+    """Return all jobs keyed by id."""
+    with locked_jobs(town) as data:
+        expire_leases(data, time.time())
+        return data["jobs"]
+
+
+def make_broker_handler(town: Town):
+    """Build a request handler speaking the worker protocol."""
+
+    class BrokerHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def reply(self, status: int, payload=None) -> None:
+            body = json.dumps(payload).encode() if payload is not None else b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/jobs":
+                self.reply(200, get_jobs(town))
+            else:
+                self.reply(404, {"error": "not found"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+                worker = body["worker"]
+            except (ValueError, KeyError):
+                self.reply(400, {"error": "expected JSON with a worker field"})
+                return
+
+            if self.path == "/claim":
+                job = claim_job(worker, town)
+                if job:
+                    self.reply(200, job)
+                else:
+                    self.reply(204)
+            elif self.path == "/heartbeat":
+                ok = heartbeat(body.get("job"), worker, town)
+                self.reply(200 if ok else 409, {"ok": ok})
+            elif self.path == "/finish":
+                ok = finish_job(
+                    body.get("job"), worker, body.get("status"), body.get("sha"), town
+                )
+                self.reply(200 if ok else 409, {"ok": ok})
+            else:
+                self.reply(404, {"error": "not found"})
+
+    return BrokerHandler
+
+
+def serve(port: int = 0, host: str = "127.0.0.1", town: Town = None) -> BrokerServer:
+    """Start the broker in a background thread and record its port."""
+    town = get_town(town)
+    server = BrokerServer((host, port), make_broker_handler(town))
+    with locked_jobs(town) as data:
+        data["port"] = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def stop_serving(town: Town = None) -> None:
+    """Clear the recorded broker port."""
+    with locked_jobs(town) as data:
+        data["port"] = None
+
+
+def broker_url(town: Town = None) -> Optional[str]:
+    """URL workers on this machine should use, if the broker is running."""
+    path = get_town(town).path / "jobs.json"
+    if not path.exists():
+        return None
+    port = json.loads(path.read_text()).get("port")
+    return f"http://127.0.0.1:{port}" if port else None
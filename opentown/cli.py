@@ -7,11 +7,10 @@ from pathlib import Path
 from .persistence import (
     init_town,
     load_tasks,
-    save_tasks,
     load_state,
     save_state,
     load_describe,
-    TOWN_DIR,
+    get_town,
 )
 
 
@@ -25,19 +24,20 @@ def main():
 @click.option("--project-name", default="", help="Project name for describe.md")
 def init(project_name: str):
     """Initialize .town/ directory in current project."""
-    if TOWN_DIR.exists():
+    town = get_town()
+    if town.path.exists():
         click.echo("OpenTown already initialized in this project.")
         return
 
-    init_town(project_name)
-    click.echo(f"Initialized OpenTown in {TOWN_DIR}/")
+    init_town(project_name, town)
+    click.echo(f"Initialized OpenTown in {town.path}/")
     click.echo("Run 'ot describe' to start planning your work.")
 
 
 @main.command()
 def describe():
     """Open describe.md in editor."""
-    describe_path = TOWN_DIR / "describe.md"
+    describe_path = get_town().path / "describe.md"
     if not describe_path.exists():
         click.echo("Run 'ot init' first.")
         return
@@ -56,11 +56,42 @@ def ceo():
 
 @main.command()
 @click.option("--task", default=None, help="Specific task ID to work on")
-def run(task: str):
+@click.option(
+    "--resume", is_flag=True, help="Reconcile with git/tmux and continue after a crash"
+)
+@click.option(
+    "--towns", default=None, help="Comma-separated project dirs to supervise together"
+)
+@click.option("--capacity", default=8, help="Engineers shared across all --towns")
+@click.option("--interval", default=30.0, help="Seconds between supervisor passes")
+@click.option(
+    "--forecast",
+    "forecast_mode",
+    type=click.Choice(["flag", "merge", "serialize"]),
+    default="flag",
+    help="What the supervisor does with subtasks forecast to conflict",
+)
+def run(
+    task: str,
+    resume: bool,
+    towns: str,
+    capacity: int,
+    interval: float,
+    forecast_mode: str,
+):
     """Run the full pipeline: Manager -> Engineers -> QA."""
+    if towns:
+        from .supervisor import parse_towns, supervise
+
+        try:
+            supervise(parse_towns(towns), capacity, interval, forecast_mode)
+        except KeyboardInterrupt:
+            click.echo("\nSupervisor stopped.")
+        return
+
     from .monitor import run_pipeline
 
-    run_pipeline(task_id=task)
+    run_pipeline(task_id=task, resume=resume)
 
 
 @main.command()
@@ -77,11 +108,19 @@ def status():
     click.echo(f"Current Task: {state.get('current_task', 'none')}")
 
     if state.get("engineers"):
+        from .git import main_branch
+        from .progress import collect_branch_status, format_branch_status
+
+        base = main_branch()
+        branches = collect_branch_status(base)
         click.echo("\nEngineers:")
         for eng in state["engineers"]:
             click.echo(
                 f"  - {eng['id']}: {eng['status']} ({eng.get('branch', 'no branch')})"
             )
+            if eng.get("branch") in branches:
+                summary = format_branch_status(branches[eng["branch"]], base)
+                click.echo(f"      {summary}")
 
     if tasks and tasks.get("tasks"):
         pending = sum(1 for t in tasks["tasks"] if t["status"] == "pending")
@@ -92,13 +131,162 @@ def status():
         )
 
 
+@main.command()
+@click.argument("task_id")
+@click.argument("priority", type=int)
+def prioritize(task_id: str, priority: int):
+    """Set a task's priority (higher runs sooner)."""
+    from .persistence import set_task_priority
+
+    if not set_task_priority(task_id, priority):
+        click.echo(f"Task {task_id} not found.")
+        return
+    click.echo(f"Task {task_id} priority set to {priority}.")
+
+
+@main.command()
+def queue():
+    """Show pending tasks in the order they will be picked."""
+    from .persistence import effective_priority, stamp_pending, locked_tasks
+
+    with locked_tasks() as tasks:
+        if not tasks:
+            click.echo("No tasks. Run 'ot ceo' first.")
+            return
+        stamp_pending(tasks)
+    pending = [t for t in tasks.get("tasks", []) if t["status"] == "pending"]
+    pending.sort(key=lambda t: -effective_priority(t))
+
+    if not pending:
+        click.echo("No pending tasks.")
+    for t in pending:
+        click.echo(
+            f"  {t['id']}  priority {t.get('priority', 0)} "
+            f"(effective {effective_priority(t):.1f})  {t['title']}"
+        )
+
+
+@main.group()
+def tasks():
+    """Batch edits to tasks.json and state.json."""
+    pass
+
+
+@tasks.command("apply")
+@click.argument("patch", type=click.File("r"))
+@click.option("--dry-run", is_flag=True, help="Validate without writing")
+def tasks_apply(patch, dry_run: bool):
+    """Apply a JSON patch of task/engineer ops in one atomic write.
+
+    PATCH is a list of ops, or {"expect": {"tasks": N}, "ops": [...]} to
+    reject the batch if tasks.json changed since version N. Use - for stdin.
+    """
+    import json
+    from .persistence import apply_batch, BatchError, ConflictError
+
+    try:
+        data = json.load(patch)
+    except ValueError as e:
+        raise click.ClickException(f"Invalid JSON: {e}")
+    if isinstance(data, list):
+        data = {"ops": data}
+    elif not isinstance(data, dict):
+        raise click.ClickException("Patch must be a list of ops or an object")
+
+    try:
+        result = apply_batch(
+            data.get("ops", []), expect=data.get("expect"), dry_run=dry_run
+        )
+    except (BatchError, ConflictError) as e:
+        raise click.ClickException(f"Batch rejected: {e}")
+
+    verb = "Validated" if dry_run else "Applied"
+    versions = ", ".join(f"{k} v{v}" for k, v in sorted(result["versions"].items()))
+    click.echo(f"{verb} {result['applied']} ops ({versions})")
+
+
+@main.command()
+@click.option("--task", "task_id", default=None, help="Task to forecast (default: current)")
+@click.option(
+    "--mode",
+    type=click.Choice(["flag", "merge", "serialize"]),
+    default="flag",
+    help="flag overlaps, merge them onto one engineer, or defer them to a new task",
+)
+@click.option("--threshold", default=0.25, help="Predicted-file similarity that counts as overlap")
+@click.option("--report", is_flag=True, help="Compare past forecasts with actual conflicts")
+def forecast(task_id: str, mode: str, threshold: float, report: bool):
+    """Predict file overlaps between subtasks before spawning engineers."""
+    from .forecast import apply_forecast, print_forecast, print_forecast_report
+
+    if report:
+        print_forecast_report()
+        return
+
+    task_id = task_id or (load_state() or {}).get("current_task")
+    if not task_id:
+        click.echo("No current task. Pass --task or run 'ot run' first.")
+        return
+
+    result = apply_forecast(task_id, mode, threshold)
+    if result is None:
+        click.echo(f"Task {task_id} not found.")
+        return
+    print_forecast(result, {"id": task_id})
+
+
 @main.command()
 @click.argument("count", type=int, default=1)
-def spawn(count: int):
+@click.option(
+    "--executor",
+    type=click.Choice(["local", "worker"]),
+    default=None,
+    help="Where engineers run (default: .town/executor.json, else local)",
+)
+def spawn(count: int, executor: str):
     """Spawn N engineer instances."""
     from .roles.engineer import spawn_engineers
 
-    spawn_engineers(count)
+    spawn_engineers(count, executor=executor)
+
+
+@main.command()
+@click.argument("engineer_id")
+def bootstrap(engineer_id: str):
+    """Provision cached dependencies into an engineer's worktree."""
+    from .bootstrap import bootstrap_worktree
+    from .persistence import get_worktree_path
+
+    worktree_path = get_worktree_path(engineer_id)
+    if not worktree_path.exists():
+        click.echo(f"No worktree for {engineer_id}.")
+        return
+
+    report = bootstrap_worktree(worktree_path)
+    if not report:
+        click.echo("No lockfiles found; nothing to bootstrap.")
+    for recipe, outcome in report.items():
+        click.echo(f"  {recipe}: {outcome}")
+
+
+@main.command()
+@click.argument("engineer_id")
+@click.option("--follow", "-f", is_flag=True, help="Stream new output as it arrives")
+@click.option("--grep", "pattern", default=None, help="Only show lines matching regex")
+@click.option("--lines", "-n", default=50, help="Number of lines to show")
+def logs(engineer_id: str, follow: bool, pattern: str, lines: int):
+    """Show captured session output for an engineer."""
+    from .logs import read_logs, follow_logs
+
+    for line in read_logs(engineer_id, lines=lines, pattern=pattern):
+        click.echo(line)
+
+    if follow:
+        try:
+            for line in follow_logs(engineer_id, pattern=pattern):
+                click.echo(line)
+        except KeyboardInterrupt:
+            pass
 
 
 @main.command()
@@ -109,6 +297,19 @@ def qa():
     run_qa()
 
 
+@main.command()
+@click.argument("engineer_id")
+def done(engineer_id: str):
+    """Mark an engineer's work as done (run by the engineer when finished)."""
+    from .persistence import update_engineer_status
+
+    state = load_state()
+    if not state or not any(e["id"] == engineer_id for e in state.get("engineers", [])):
+        raise click.ClickException(f"No engineer {engineer_id} in the current task")
+    update_engineer_status(engineer_id, "done")
+    click.echo(f"{engineer_id} marked done.")
+
+
 @main.command()
 def complete():
     """Mark current task as complete and cleanup."""
@@ -117,5 +318,224 @@ def complete():
     complete_task()
 
 
+@main.command()
+@click.option("--dry-run", is_flag=True, help="Report what would be removed")
+@click.option("--force", is_flag=True, help="Also delete unmerged orphan branches")
+@click.option(
+    "--every", type=int, default=None, help="Keep running, collecting every N seconds"
+)
+def gc(dry_run: bool, force: bool, every: int):
+    """Reclaim stale worktrees, branches and tmux sessions."""
+    from .gc import collect_garbage, print_report, gc_loop
+
+    if every:
+        print(f"GC: Collecting every {every}s (Ctrl+C to stop)...")
+        try:
+            gc_loop(every, force=force)
+        except KeyboardInterrupt:
+            print("\nGC stopped.")
+        return
+
+    print_report(collect_garbage(dry_run=dry_run, force=force), dry_run=dry_run)
+
+
+@main.group()
+def governor():
+    """Shared LLM rate-limit and token budget for all agents."""
+    pass
+
+
+@governor.command("status")
+def governor_status():
+    """Show budget, concurrency limit and per-role accounting."""
+    from .governor import get_status
+
+    status = get_status()
+    config = status["config"]
+    click.echo(
+        f"Concurrency limit: {status['limit']:.2f} "
+        f"({len(status['in_flight'])} in flight)"
+    )
+    click.echo(
+        f"Requests: {status['requests']:.1f}/{config['requests_per_minute']} per min"
+    )
+    click.echo(f"Tokens: {status['tokens']:.0f}/{config['tokens_per_minute']} per min")
+    if config.get("port"):
+        click.echo(f"Proxy: http://127.0.0.1:{config['port']}/<role>")
+    for role, stats in sorted(status["roles"].items()):
+        click.echo(
+            f"  {role}: {stats['requests']} requests, {stats['tokens']} tokens, "
+            f"{stats['throttles']} throttles, waited {stats['wait_seconds']:.1f}s"
+        )
+
+
+@governor.command("config")
+@click.option("--rpm", type=int, default=None, help="Requests per minute")
+@click.option("--tpm", type=int, default=None, help="Tokens per minute")
+@click.option("--max-concurrency", type=int, default=None)
+@click.option("--min-concurrency", type=int, default=None)
+def governor_config(rpm: int, tpm: int, max_concurrency: int, min_concurrency: int):
+    """Set provider budget limits."""
+    from .governor import configure
+
+    config = configure(
+        requests_per_minute=rpm,
+        tokens_per_minute=tpm,
+        max_concurrency=max_concurrency,
+        min_concurrency=min_concurrency,
+    )
+    for key, value in config.items():
+        click.echo(f"  {key}: {value}")
+
+
+@governor.command("serve")
+@click.option("--upstream", required=True, help="Provider base URL to forward to")
+@click.option("--port", type=int, default=0, help="Local port (default: any free)")
+def governor_serve(upstream: str, port: int):
+    """Run the governor proxy; agents use http://127.0.0.1:PORT/<role>."""
+    import time
+    from .governor import serve, stop_serving
+
+    server = serve(upstream, port)
+    click.echo(f"Governor proxy on http://127.0.0.1:{server.server_address[1]}/<role>")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        stop_serving()
+        click.echo("\nGovernor stopped.")
+
+
+@governor.command("bench")
+@click.option("--workers", default=16, help="Concurrent simulated agents")
+@click.option("--requests", default=200, help="Total requests to send")
+@click.option("--capacity", default=10.0, help="Stand-in endpoint requests/second")
+def governor_bench(workers: int, requests: int, capacity: float):
+    """Measure the governor against a local throttling stand-in endpoint."""
+    import tempfile
+    from .governor import bench
+
+    with tempfile.TemporaryDirectory() as tmp:
+        result = bench(workers, requests, capacity, governor_dir=Path(tmp))
+
+    click.echo(
+        f"{result['ok']} ok, {result['throttled']} throttled, "
+        f"{result['errors']} errors in "
+        f"{result['elapsed']:.1f}s ({result['throughput']:.1f} req/s)"
+    )
+    click.echo(f"Final concurrency limit: {result['limit']:.2f}")
+    for role, stats in sorted(result["roles"].items()):
+        click.echo(
+            f"  {role}: {stats['requests']} requests, {stats['throttles']} throttles"
+        )
+
+
+@main.group()
+def broker():
+    """Job broker that hands engineers to worker agents."""
+    pass
+
+
+@broker.command("serve")
+@click.option("--port", type=int, default=0, help="Port to listen on (default: any free)")
+@click.option("--host", default="127.0.0.1", help="Use 0.0.0.0 for remote workers")
+def broker_serve(port: int, host: str):
+    """Serve queued engineer jobs to workers."""
+    import time
+    from .broker import serve, stop_serving
+
+    server = serve(port, host)
+    click.echo(f"Broker on http://{host}:{server.server_address[1]}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        stop_serving()
+        click.echo("\nBroker stopped.")
+
+
+@broker.command("jobs")
+def broker_jobs():
+    """List engineer jobs and which worker holds them."""
+    from .broker import get_jobs
+
+    jobs = get_jobs()
+    if not jobs:
+        click.echo("No jobs.")
+    for job in jobs.values():
+        holder = f" on {job['worker']}" if job["worker"] else ""
+        click.echo(
+            f"  {job['id']}: {job['status']}{holder} "
+            f"({job['branch']}, attempt {job['attempts']})"
+        )
+
+
+@main.command()
+@click.option("--broker", "broker_url", required=True, help="Broker URL")
+@click.option("--workdir", default=None, help="Checkout directory (default: temp dir)")
+@click.option("--command", default=None, help="Agent command; the prompt is appended")
+@click.option("--processes", default=1, help="Run N local workers (stand-in nodes)")
+@click.option("--poll", default=5.0, help="Seconds between claims when idle")
+@click.option("--once", is_flag=True, help="Exit when the job queue is empty")
+def worker(
+    broker_url: str, workdir: str, command: str, processes: int, poll: float, once: bool
+):
+    """Run engineer jobs from a broker on this machine."""
+    import tempfile
+    from .worker import DEFAULT_COMMAND, work, start_workers
+
+    workdir = Path(workdir or tempfile.mkdtemp(prefix="opentown-worker-"))
+    options = {"command": command or DEFAULT_COMMAND, "poll": poll, "once": once}
+    click.echo(f"Worker: {processes} process(es) in {workdir}")
+    try:
+        if processes > 1:
+            for process in start_workers(processes, broker_url, workdir, **options):
+                process.join()
+        else:
+            work(broker_url, workdir, **options)
+    except KeyboardInterrupt:
+        click.echo("\nWorker stopped.")
+
+
+@main.command()
+@click.option("--engineers", default=10, help="Simulated engineers per task")
+@click.option("--tasks", default=3, help="Tasks to run back to back")
+@click.option("--delay", default=1.0, help="Mean seconds before an engineer finishes")
+@click.option("--fail-rate", default=0.05, help="Chance an attempt fails")
+@click.option("--stall-rate", default=0.02, help="Chance an attempt never finishes")
+@click.option("--conflict-rate", default=0.1, help="Chance of editing a shared file")
+@click.option("--stall-timeout", default=10.0, help="Seconds before a stall is restarted")
+@click.option("--poll", default=0.2, help="Monitor poll interval in seconds")
+@click.option("--seed", type=int, default=None, help="Random seed")
+@click.option("--keep", is_flag=True, help="Keep the throwaway repo")
+def simulate(
+    engineers, tasks, delay, fail_rate, stall_rate, conflict_rate, stall_timeout,
+    poll, seed, keep,
+):
+    """Load-test the control plane with simulated engineers."""
+    from .simulate import simulate as run_simulation, print_report
+
+    options = [
+        f"--engineers={engineers}",
+        f"--tasks={tasks}",
+        f"--delay={delay}",
+        f"--fail-rate={fail_rate}",
+        f"--stall-rate={stall_rate}",
+        f"--conflict-rate={conflict_rate}",
+        f"--stall-timeout={stall_timeout}",
+        f"--poll={poll}",
+    ]
+    if seed is not None:
+        options.append(f"--seed={seed}")
+
+    click.echo(f"Simulating {tasks} tasks with {engineers} engineers each...")
+    report = run_simulation(options, keep=keep)
+    print_report(report)
+    if keep:
+        click.echo(f"Repo kept at {report['repo']}")
+
+
 if __name__ == "__main__":
     main()
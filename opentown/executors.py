@@ -0,0 +1,187 @@
+"""Engineer executors - where engineers' worktrees and sessions live.
+
+The local executor gives each engineer a worktree under .town/worktrees
+and a tmux session on this machine. The worker executor queues each
+engineer as a job on the broker; worker agents on other machines check the
+branch out of the shared bare repo .town/remote.git, run the agent and push
+the branch back, which the broker then fetches into the project.
+"""
+
+from pathlib import Path
+from typing import Optional
+from .persistence import (
+    load_json,
+    create_worktree,
+    remove_worktree,
+    get_session_name,
+    update_engineer_status,
+    get_town,
+    Town,
+)
+from .git import run_git, rev_parse
+from . import tmux
+
+EXECUTORS = ("local", "worker")
+
+WORKER_PROMPT = """
+You are Engineer {engineer_id}.
+
+Your assignment:
+- Subtask ID: {subtask_id}
+- Description: {subtask_desc}
+- Branch: {branch_name}
+
+Implement the subtask in the current directory and commit your changes to
+the branch. Do not push; the worker pushes and reports back when you exit.
+
+Guidelines:
+- Follow existing code patterns
+- Write tests if applicable
+- Keep changes focused on your subtask
+"""
+
+
+def load_executor_config(town: Town = None) -> dict:
+    """Load .town/executor.json ({"executor": name, "remote_url": url})."""
+    config = load_json(get_town(town).path / "executor.json") or {}
+    return {"executor": "local", "remote_url": None, **config}
+
+
+def get_executor(executor=None, town: Town = None):
+    """Return an executor instance for a name (default: the town's config)."""
+    if executor is not None and not isinstance(executor, str):
+        return executor
+    config = load_executor_config(town)
+    name = executor or config["executor"]
+    if name == "local":
+        return LocalExecutor(town)
+    if name == "worker":
+        return WorkerExecutor(town, remote_url=config["remote_url"])
+    raise ValueError(f"Unknown executor {name!r} (choose from {', '.join(EXECUTORS)})")
+
+
+class LocalExecutor:
+    """Engineers as worktrees and tmux sessions on this machine."""
+
+    name = "local"
+
+    def __init__(self, town: Town = None):
+        self.town = get_town(town)
+
+    def prepare(self, engineer_id: str, branch: str, base_sha: str) -> Optional[Path]:
+        """Create the engineer's branch and return its local worktree."""
+        return create_worktree(engineer_id, branch, self.town)
+
+    def launch(self, engineer: dict, subtasks: list) -> None:
+        """Start the engineer's session, marking it failed if tmux refuses."""
+        from .roles.engineer import create_engineer_session
+
+        started = create_engineer_session(
+            engineer["id"],
+            ", ".join(st["id"] for st in subtasks),
+            "; ".join(st["desc"] for st in subtasks),
+            engineer["branch"],
+            self.town,
+            session_name=get_session_name(engineer, self.town),
+        )
+        if not started:
+            update_engineer_status(engineer["id"], "failed", town=self.town)
+
+    def collect(self, engineer: dict) -> bool:
+        """Make the engineer's branch available in the project repo."""
+        return True
+
+    def release(self, engineer: dict) -> None:
+        """Tear down what prepare and launch created.
+
+        The session is only killed if it was started in this town's
+        worktrees, so a same-named session elsewhere survives.
+        """
+        session = get_session_name(engineer, self.town)
+        if session in tmux.sessions_under(self.town.path / "worktrees"):
+            tmux.kill_session(session)
+        remove_worktree(engineer["id"], self.town)
+
+
+class WorkerExecutor:
+    """Engineers as broker jobs run by worker agents, possibly elsewhere."""
+
+    name = "worker"
+
+    def __init__(self, town: Town = None, remote_url: str = None):
+        self.town = get_town(town)
+        self.remote_path = self.town.path / "remote.git"
+        # Workers on other machines may need e.g. an ssh:// URL instead.
+        self.remote_url = remote_url or str(self.remote_path)
+
+    def ensure_remote(self) -> None:
+        """Create the shared bare repo if needed."""
+        if not self.remote_path.exists():
+            run_git("init", "--bare", "-q", str(self.remote_path))
+
+    def prepare(self, engineer_id: str, branch: str, base_sha: str) -> Optional[Path]:
+        """Publish the branch to the shared repo. No local worktree.
+
+        An existing local branch is published as is, so its commits carry
+        over; otherwise the branch starts at base_sha.
+        """
+        self.ensure_remote()
+        head = rev_parse(f"refs/heads/{branch}", cwd=self.town.project_dir)
+        run_git(
+            "push",
+            "-q",
+            "-f",
+            str(self.remote_path),
+            f"{head or base_sha}:refs/heads/{branch}",
+            cwd=self.town.project_dir,
+        )
+        return None
+
+    def launch(self, engineer: dict, subtasks: list) -> None:
+        """Queue the engineer's job on the broker."""
+        from .broker import add_job
+
+        prompt = WORKER_PROMPT.format(
+            engineer_id=engineer["id"],
+            subtask_id=", ".join(st["id"] for st in subtasks),
+            subtask_desc="; ".join(st["desc"] for st in subtasks),
+            branch_name=engineer["branch"],
+        )
+        add_job(
+            {
+                "engineer": engineer["id"],
+                "branch": engineer["branch"],
+                "base_sha": engineer.get("base_sha"),
+                "remote": self.remote_url,
+                "prompt": prompt,
+            },
+            self.town,
+        )
+
+    def collect(self, engineer: dict) -> bool:
+        """Fetch the engineer's branch once its job has finished.
+
+        The fetch only fast-forwards, so local commits are never rewound.
+        """
+        from .broker import get_jobs
+
+        job = get_jobs(self.town).get(engineer["id"])
+        if not job or job["status"] != "done":
+            return False
+        branch = engineer["branch"]
+        result = run_git(
+            "fetch",
+            "-q",
+            str(self.remote_path),
+            f"refs/heads/{branch}:refs/heads/{branch}",
+            cwd=self.town.project_dir,
+        )
+        return result.returncode == 0
+
+    def release(self, engineer: dict) -> None:
+        """Cancel the engineer's job and drop its branch from the shared repo."""
+        from .broker import cancel_job
+
+        cancel_job(engineer["id"], self.town)
+        if self.remote_path.exists():
+            run_git("branch", "-D", engineer["branch"], cwd=self.remote_path)
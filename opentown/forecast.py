@@ -0,0 +1,393 @@
+"""Conflict forecasting - predict which files subtasks touch before spawning.
+
+Subtask descriptions are matched against an index of path components and
+symbol names from the current tree, and the matches are widened with
+files that historically change together. Subtasks whose predicted files
+overlap are flagged, given to one engineer (merge), or split off into a
+follow-up task that runs after this one lands (serialize).
+"""
+
+import math
+import re
+from typing import Optional
+from .persistence import (
+    load_json,
+    save_json,
+    load_tasks,
+    locked_tasks,
+    effective_priority,
+    get_town,
+    Town,
+)
+from .git import git_output, rev_parse
+from .history import load_history
+
+MODES = ("flag", "merge", "serialize")
+OVERLAP_THRESHOLD = 0.25  # Jaccard similarity of predicted files
+MAX_PREDICTED = 8
+COCHANGE_COMMITS = 1000
+COCHANGE_MIN = 0.5  # P(other changes | file changes) needed to widen
+COCHANGE_LIFT = 2.0  # ...and how much likelier than other changing at all
+MAX_SCAN_BYTES = 256 * 1024
+
+SYMBOL_RE = re.compile(
+    r"\b(?:def|class|function|func|fn|interface|type|struct|enum|trait|module)"
+    r"\s+([A-Za-z_][A-Za-z0-9_]*)"
+)
+WORD_RE = re.compile(r"[A-Za-z][a-z0-9]*|[A-Z]+(?![a-z])|\d+")
+STOPWORDS = {
+    "the", "and", "for", "with", "from", "into", "that", "this", "add", "use",
+    "make", "new", "when", "each", "all", "should", "can", "not", "are", "any",
+    "update", "support", "implement", "create", "fix", "change", "test", "tests",
+}
+
+
+def tokenize(text: str) -> list:
+    """Split text, paths and identifiers into lowercase words."""
+    return [
+        word.lower()
+        for word in WORD_RE.findall(text)
+        if len(word) >= 3 and word.lower() not in STOPWORDS
+    ]
+
+
+def get_index_path(town: Town = None):
+    """Get the forecast index cache file."""
+    return get_town(town).path / "cache" / "forecast_index.json"
+
+
+def scan_symbols(path) -> set:
+    """Return words from symbol names defined in a file."""
+    try:
+        if path.stat().st_size > MAX_SCAN_BYTES:
+            return set()
+        text = path.read_text(errors="ignore")
+    except OSError:
+        return set()
+    words = set()
+    for name in SYMBOL_RE.findall(text):
+        words.update(tokenize(name))
+    return words
+
+
+def cochange_stats(cwd) -> tuple:
+    """Count commits per file and per pair of files changed together."""
+    output = git_output(
+        "log",
+        "--no-merges",
+        f"-n{COCHANGE_COMMITS}",
+        "--name-only",
+        "--format=%x1e",
+        cwd=cwd,
+    )
+    commits = {"": 0}  # "" counts every usable commit
+    pairs = {}
+    for entry in output.split("\x1e"):
+        files = sorted({line for line in entry.split("\n") if line.strip()})
+        # Sweeping commits (renames, reformatting) say nothing about coupling.
+        if not files or len(files) > 50:
+            continue
+        commits[""] += 1
+        for path in files:
+            commits[path] = commits.get(path, 0) + 1
+            related = pairs.setdefault(path, {})
+            for other in files:
+                if other != path:
+                    related[other] = related.get(other, 0) + 1
+    return commits, pairs
+
+
+def build_index(town: Town = None) -> dict:
+    """Index the current tree and history, cached per HEAD commit."""
+    town = get_town(town)
+    cwd = town.project_dir
+    head = rev_parse("HEAD", cwd=cwd)
+    cache_path = get_index_path(town)
+    cached = load_json(cache_path)
+    if cached and cached.get("head") == head:
+        return cached
+
+    tokens = {}
+    paths = [p for p in git_output("ls-files", cwd=cwd).split("\n") if p]
+    for path in paths:
+        weights = {}
+        for word in scan_symbols(cwd / path):
+            weights[word] = 1
+        # Path components are stronger evidence than symbols inside the file.
+        for word in tokenize(path):
+            weights[word] = 2
+        for word, weight in weights.items():
+            tokens.setdefault(word, {})[path] = weight
+
+    commits, pairs = cochange_stats(cwd)
+    index = {
+        "head": head,
+        "files": len(paths),
+        "paths": paths,
+        "tokens": tokens,
+        "commits": commits,
+        "pairs": pairs,
+    }
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    save_json(cache_path, index)
+    return index
+
+
+def predict_files(desc: str, index: dict) -> list:
+    """Predict the files a subtask description will touch, best first."""
+    scores = {}
+    for path in index["paths"]:
+        # Explicitly named files are certain.
+        name = path.rsplit("/", 1)[-1]
+        if path in desc or ("." in name and re.search(rf"\b{re.escape(name)}\b", desc)):
+            scores[path] = math.inf
+
+    total = max(1, index["files"])
+    for word in set(tokenize(desc)):
+        matches = index["tokens"].get(word, {})
+        if not matches:
+            continue
+        idf = math.log(1 + total / len(matches))
+        for path, weight in matches.items():
+            scores[path] = scores.get(path, 0.0) + idf * weight
+
+    finite = [score for score in scores.values() if score != math.inf]
+    floor = 0.5 * max(finite) if finite else math.inf
+    ranked = sorted(scores, key=lambda p: (-scores[p], p))
+    predicted = [p for p in ranked if scores[p] >= floor][:MAX_PREDICTED]
+
+    # Widen with files that usually change alongside the predicted ones.
+    # Files that change in most commits (changelogs, CLI tables) are not
+    # coupled to anything in particular, so the lift test leaves them out.
+    total = max(1, index["commits"].get("", 0))
+    for path in list(predicted):
+        seen = index["commits"].get(path, 0)
+        if seen < 2:
+            continue
+        for other, together in index["pairs"].get(path, {}).items():
+            confidence = together / seen
+            base_rate = index["commits"][other] / total
+            if (
+                together >= 2
+                and confidence >= COCHANGE_MIN
+                and confidence >= COCHANGE_LIFT * base_rate
+                and other not in predicted
+            ):
+                predicted.append(other)
+    return predicted
+
+
+def find_overlaps(files: dict, threshold: float = OVERLAP_THRESHOLD) -> list:
+    """Pairs of subtasks whose predicted files overlap, most similar first."""
+    ids = list(files)
+    overlaps = []
+    for i, a in enumerate(ids):
+        for b in ids[i + 1 :]:
+            shared = set(files[a]) & set(files[b])
+            if not shared:
+                continue
+            score = len(shared) / len(set(files[a]) | set(files[b]))
+            if score >= threshold:
+                overlaps.append(
+                    {"a": a, "b": b, "shared": sorted(shared), "score": score}
+                )
+    overlaps.sort(key=lambda o: -o["score"])
+    return overlaps
+
+
+def group_subtasks(ids: list, overlaps: list) -> list:
+    """Union overlapping subtasks into groups, keeping subtask order."""
+    parent = {sid: sid for sid in ids}
+
+    def find(sid):
+        while parent[sid] != sid:
+            parent[sid] = parent[parent[sid]]
+            sid = parent[sid]
+        return sid
+
+    for overlap in overlaps:
+        parent[find(overlap["b"])] = find(overlap["a"])
+
+    groups = {}
+    for sid in ids:
+        groups.setdefault(find(sid), []).append(sid)
+    return list(groups.values())
+
+
+def forecast_task(
+    task: dict, town: Town = None, threshold: float = OVERLAP_THRESHOLD
+) -> dict:
+    """Forecast files, overlaps and conflict-free groups for a task."""
+    index = build_index(town)
+    subtasks = task.get("subtasks", [])
+    files = {st["id"]: predict_files(st.get("desc", ""), index) for st in subtasks}
+    overlaps = find_overlaps(files, threshold)
+    return {
+        "files": files,
+        "overlaps": overlaps,
+        "groups": group_subtasks([st["id"] for st in subtasks], overlaps),
+    }
+
+
+def next_task_id(tasks: dict) -> str:
+    """Next free task-NNN id."""
+    numbers = [
+        int(match.group(1))
+        for task in tasks.get("tasks", [])
+        if (match := re.match(r"task-(\d+)$", task["id"]))
+    ]
+    return f"task-{max(numbers, default=0) + 1:03d}"
+
+
+def apply_forecast(
+    task_id: str,
+    mode: str = "flag",
+    threshold: float = OVERLAP_THRESHOLD,
+    town: Town = None,
+) -> Optional[dict]:
+    """Forecast a task and act on overlaps. Returns the forecast.
+
+    flag records the forecast only. merge makes each overlapping group one
+    engineer's work. serialize keeps the first subtask of each group and
+    moves the rest into a follow-up task queued to run next.
+    """
+    tasks = load_tasks(town)
+    task = next((t for t in (tasks or {}).get("tasks", []) if t["id"] == task_id), None)
+    if task is None:
+        return None
+
+    result = forecast_task(task, town, threshold)
+    result["mode"] = mode
+    with locked_tasks(town) as tasks:
+        task = next(t for t in tasks["tasks"] if t["id"] == task_id)
+        apply_mode(task, tasks, result, mode)
+    return result
+
+
+def apply_mode(task: dict, tasks: dict, result: dict, mode: str) -> None:
+    """Record a forecast on its task and regroup or split it for mode."""
+    task["forecast"] = {"files": result["files"], "mode": mode}
+
+    task.pop("groups", None)
+    if mode == "merge":
+        task["groups"] = result["groups"]
+    elif mode == "serialize":
+        deferred = {sid for group in result["groups"] for sid in group[1:]}
+        if deferred:
+            pending = [t for t in tasks["tasks"] if t["status"] == "pending"]
+            priority = max(
+                [task.get("priority", 0)]
+                + [math.ceil(effective_priority(t)) for t in pending]
+            )
+            follow_up = {
+                "id": next_task_id(tasks),
+                "title": f"{task['title']} (serialized)",
+                "status": "pending",
+                "priority": priority + 1,
+                "subtasks": [st for st in task["subtasks"] if st["id"] in deferred],
+            }
+            task["subtasks"] = [
+                st for st in task["subtasks"] if st["id"] not in deferred
+            ]
+            task["forecast"]["files"] = {
+                sid: f for sid, f in result["files"].items() if sid not in deferred
+            }
+            tasks["tasks"].append(follow_up)
+            result["follow_up"] = follow_up["id"]
+
+
+def compare_forecast(task: dict, engineers: list, changes: dict) -> Optional[dict]:
+    """Compare a task's forecast with the files its engineers actually changed.
+
+    Conflicts are counted between engineer pairs: a pair is predicted to
+    conflict when their predicted files overlap and actually conflicts
+    when their changed files do.
+    """
+    predicted_files = (task.get("forecast") or {}).get("files")
+    if not predicted_files:
+        return None
+
+    predicted = {}
+    actual = {}
+    for eng in engineers:
+        ids = eng.get("subtask_ids") or [eng.get("subtask_id")]
+        predicted[eng["id"]] = {f for sid in ids for f in predicted_files.get(sid, [])}
+        actual[eng["id"]] = set(changes.get(eng["id"], {}))
+
+    hits = sum(len(predicted[e] & actual[e]) for e in predicted)
+    n_predicted = sum(len(files) for files in predicted.values())
+    n_actual = sum(len(files) for files in actual.values())
+
+    ids = sorted(predicted)
+    predicted_pairs = set()
+    actual_pairs = set()
+    for i, a in enumerate(ids):
+        for b in ids[i + 1 :]:
+            if predicted[a] & predicted[b]:
+                predicted_pairs.add((a, b))
+            if actual[a] & actual[b]:
+                actual_pairs.add((a, b))
+
+    return {
+        "file_precision": hits / n_predicted if n_predicted else None,
+        "file_recall": hits / n_actual if n_actual else None,
+        "predicted_conflicts": len(predicted_pairs),
+        "actual_conflicts": len(actual_pairs),
+        "caught_conflicts": len(predicted_pairs & actual_pairs),
+    }
+
+
+def print_forecast(result: dict, task: dict) -> None:
+    """Print predicted files and overlaps for a task."""
+    print(f"Forecast: {task['id']} ({len(result['files'])} subtasks)")
+    for sid, files in result["files"].items():
+        shown = ", ".join(files[:5]) or "no prediction"
+        if len(files) > 5:
+            shown += f" +{len(files) - 5} more"
+        print(f"  [{sid}] {shown}")
+
+    if not result["overlaps"]:
+        print("Forecast: No overlapping subtasks.")
+        return
+    print(f"Forecast: {len(result['overlaps'])} overlapping pairs")
+    for overlap in result["overlaps"]:
+        print(
+            f"  ! {overlap['a']} <-> {overlap['b']} ({overlap['score']:.0%}): "
+            f"{', '.join(overlap['shared'][:3])}"
+        )
+    mode = result.get("mode", "flag")
+    if mode == "merge":
+        merged = [g for g in result["groups"] if len(g) > 1]
+        for group in merged:
+            print(f"Forecast: One engineer will do {', '.join(group)}")
+    elif mode == "serialize" and result.get("follow_up"):
+        print(f"Forecast: Deferred overlapping subtasks to {result['follow_up']}")
+    else:
+        print("Forecast: Use 'ot forecast --mode merge' or '--mode serialize' to act.")
+
+
+def print_forecast_report(town: Town = None) -> None:
+    """Print forecast accuracy over finished tasks."""
+    records = [t for t in load_history(town).get("tasks", []) if t.get("forecast")]
+    if not records:
+        print("No finished tasks with a forecast yet.")
+        return
+
+    def pct(value):
+        return "n/a" if value is None else f"{value:.0%}"
+
+    print("Task        predicted  actual  caught  precision  recall")
+    for record in records:
+        f = record["forecast"]
+        print(
+            f"  {record['task_id']:<10}{f['predicted_conflicts']:>9}"
+            f"{f['actual_conflicts']:>8}{f['caught_conflicts']:>8}"
+            f"{pct(f['file_precision']):>11}{pct(f['file_recall']):>8}"
+        )
+    actual = sum(r["forecast"]["actual_conflicts"] for r in records)
+    caught = sum(r["forecast"]["caught_conflicts"] for r in records)
+    predicted = sum(r["forecast"]["predicted_conflicts"] for r in records)
+    print(
+        f"Forecast caught {caught}/{actual} actual conflicts "
+        f"with {predicted - caught} false alarms over {len(records)} tasks"
+    )
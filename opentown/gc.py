@@ -0,0 +1,236 @@
+"""Garbage collection - reclaim stale worktrees, branches and tmux sessions."""
+
+import os
+import shutil
+import time
+from pathlib import Path
+from .persistence import load_state, load_tasks, get_session_name, get_town, Town
+from .git import (
+    run_git,
+    git_output,
+    list_worktrees,
+    list_engineer_branches,
+    is_merged,
+    delete_branch,
+    count_refs,
+    main_branch,
+    rev_parse,
+)
+from . import tmux
+
+
+def dir_size(path: Path) -> int:
+    """Return total size in bytes of files under path (symlinks not followed)."""
+    total = 0
+    stack = [str(path)]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    else:
+                        total += entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    pass
+    return total
+
+
+def count_loose_refs(cwd: Path = None) -> int:
+    """Count loose ref files in the repository's refs/ directory."""
+    common_dir = git_output("rev-parse", "--git-common-dir", cwd=cwd)
+    if not common_dir:
+        return 0
+    refs_dir = Path(cwd or ".") / common_dir / "refs"
+    return sum(len(files) for _, _, files in os.walk(refs_dir))
+
+
+def format_bytes(size: int) -> str:
+    """Format a byte count for humans."""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def active_engineers(state: dict) -> list:
+    """Return engineers that belong to the in-flight task."""
+    if not state or not state.get("current_task"):
+        return []
+    return state.get("engineers", [])
+
+
+def branch_is_reclaimable(
+    branch: str,
+    tasks: dict,
+    base: str,
+    force: bool,
+    cwd: Path = None,
+    mainline: set = frozenset(),
+) -> bool:
+    """Check whether an orphaned engineer branch can be deleted safely.
+
+    A branch is reclaimable when its work is already merged, when its task is
+    done or no longer exists, or when force is set. A branch whose tip lies on
+    base's first-parent line (mainline) carries no work of its own, so being
+    an ancestor of base does not make it merged.
+    """
+    if force:
+        return True
+    if (
+        base
+        and is_merged(branch, base, cwd=cwd)
+        and rev_parse(branch, cwd=cwd) not in mainline
+    ):
+        return True
+
+    task_id = branch.rsplit("-eng-", 1)[0]
+    for task in (tasks or {}).get("tasks", []):
+        if task["id"] == task_id:
+            return task.get("status") == "done"
+    return True
+
+
+def collect_garbage(
+    dry_run: bool = False, force: bool = False, town: Town = None
+) -> dict:
+    """Reconcile worktrees, branches and tmux sessions against state.json.
+
+    Anything not owned by the current task's engineers is removed. Returns a
+    report with the removed items, reclaimed bytes and ref counts.
+    """
+    town = get_town(town)
+    cwd = town.project_dir
+    state = load_state(town) or {}
+    tasks = load_tasks(town) or {}
+    engineers = active_engineers(state)
+    # Engineers are only written to state after every worktree is prepared,
+    # so anything named after the current task is live even if unlisted.
+    task_prefix = f"{state['current_task']}-eng-" if state.get("current_task") else None
+    planning = state.get("phase") == "planning"
+
+    live_ids = {eng["id"] for eng in engineers}
+    live_branches = {eng["branch"] for eng in engineers if eng.get("branch")}
+    live_sessions = {get_session_name(eng, town) for eng in engineers}
+
+    report = {
+        "worktrees": [],
+        "branches": [],
+        "kept_branches": [],
+        "sessions": [],
+        "skipped_planning": planning,
+        "bytes_reclaimed": 0,
+        "refs_before": count_refs(cwd=cwd),
+        "loose_refs_before": count_loose_refs(cwd),
+    }
+
+    # Worktrees: directories under .town/worktrees plus registered worktrees
+    # that live there but whose directory is gone or unowned. While a task is
+    # being planned, spawn may be creating worktrees that git does not know
+    # about yet, so they and their sessions are left alone.
+    worktrees_dir = (town.path / "worktrees").resolve()
+    registered = {Path(wt["path"]): wt["branch"] for wt in list_worktrees(cwd=cwd)}
+    live_paths = {
+        path
+        for path, branch in registered.items()
+        if task_prefix and branch and branch.startswith(task_prefix)
+    }
+    candidates = {}
+    if worktrees_dir.exists() and not planning:
+        for entry in worktrees_dir.iterdir():
+            if entry.is_dir() and entry.name not in live_ids:
+                candidates[entry.resolve()] = entry.name
+        for path in registered:
+            if path.parent == worktrees_dir and path.name not in live_ids:
+                candidates.setdefault(path, path.name)
+    for path in live_paths:
+        candidates.pop(path, None)
+
+    for path, name in sorted(candidates.items()):
+        size = dir_size(path) if path.exists() else 0
+        if not dry_run:
+            run_git("worktree", "remove", "--force", str(path), cwd=cwd)
+            if path.exists():
+                shutil.rmtree(path, ignore_errors=True)
+        report["worktrees"].append(name)
+        report["bytes_reclaimed"] += size
+
+    if not dry_run:
+        run_git("worktree", "prune", cwd=cwd)
+
+    # Branches: task-NNN-eng-K refs no longer owned by an active engineer.
+    base = main_branch(cwd=cwd)
+    mainline = (
+        set(git_output("rev-list", "--first-parent", base, cwd=cwd).split())
+        if base
+        else set()
+    )
+    for branch in list_engineer_branches(cwd=cwd):
+        if branch in live_branches or (task_prefix and branch.startswith(task_prefix)):
+            continue
+        if not branch_is_reclaimable(branch, tasks, base, force, cwd, mainline):
+            report["kept_branches"].append(branch)
+            continue
+        if dry_run or delete_branch(branch, cwd=cwd):
+            report["branches"].append(branch)
+
+    # Sessions: ot-* sessions without a live engineer. Only sessions
+    # started in this town's worktrees are touched, so other projects'
+    # engineers on the same tmux server are left alone.
+    for session, path in tmux.session_paths().items():
+        if planning or session in live_sessions or not path:
+            continue
+        path = Path(path).resolve()
+        if not path.is_relative_to(worktrees_dir):
+            continue
+        if any(path.is_relative_to(live) for live in live_paths):
+            continue
+        if dry_run or tmux.kill_session(session):
+            report["sessions"].append(session)
+
+    if not dry_run:
+        run_git("pack-refs", "--all", "--prune", cwd=cwd)
+
+    report["refs_after"] = count_refs(cwd=cwd)
+    report["loose_refs_after"] = count_loose_refs(cwd)
+    return report
+
+
+def print_report(report: dict, dry_run: bool = False) -> None:
+    """Print a garbage collection report."""
+    verb = "Would remove" if dry_run else "Removed"
+    print(f"GC: {verb} {len(report['worktrees'])} worktrees")
+    for name in report["worktrees"]:
+        print(f"  - {name}")
+    print(f"GC: {verb} {len(report['branches'])} branches")
+    for branch in report["branches"]:
+        print(f"  - {branch}")
+    if report["kept_branches"]:
+        print(
+            f"GC: Kept {len(report['kept_branches'])} unmerged branches "
+            "(use --force to delete)"
+        )
+    print(f"GC: {verb} {len(report['sessions'])} tmux sessions")
+    if report["skipped_planning"]:
+        print("GC: A task is being planned; left worktrees and sessions alone")
+    print(f"GC: Disk reclaimed: {format_bytes(report['bytes_reclaimed'])}")
+    print(
+        f"GC: Refs {report['refs_before']} -> {report['refs_after']}, "
+        f"loose refs {report['loose_refs_before']} -> {report['loose_refs_after']}"
+    )
+
+
+def gc_loop(interval: int, force: bool = False, town: Town = None) -> None:
+    """Run garbage collection every interval seconds."""
+    while True:
+        report = collect_garbage(force=force, town=town)
+        removed = (
+            len(report["worktrees"]) + len(report["branches"]) + len(report["sessions"])
+        )
+        if removed:
+            print_report(report)
+        time.sleep(interval)
@@ -0,0 +1,100 @@
+"""Git helpers for OpenTown."""
+
+import re
+import subprocess
+from typing import Optional
+
+ENGINEER_BRANCH_RE = re.compile(r"^task-\d+-eng-\d+$")
+
+
+def run_git(*args: str, cwd: str = None, input: str = None) -> subprocess.CompletedProcess:
+    """Run a git command and capture its output."""
+    return subprocess.run(
+        ["git", *args], cwd=cwd, input=input, capture_output=True, text=True
+    )
+
+
+def git_output(*args: str, cwd: str = None) -> str:
+    """Run a git command and return stripped stdout ("" on failure)."""
+    result = run_git(*args, cwd=cwd)
+    if result.returncode != 0:
+        return ""
+    return result.stdout.strip()
+
+
+def list_worktrees(cwd: str = None) -> list:
+    """List git worktrees as dicts with path, head, branch and prunable keys."""
+    output = git_output("worktree", "list", "--porcelain", cwd=cwd)
+    worktrees = []
+    current = None
+
+    for line in output.split("\n"):
+        if line.startswith("worktree "):
+            current = {"path": line[len("worktree ") :], "head": None, "branch": None}
+            worktrees.append(current)
+        elif current is None:
+            continue
+        elif line.startswith("HEAD "):
+            current["head"] = line[len("HEAD ") :]
+        elif line.startswith("branch "):
+            current["branch"] = line[len("branch ") :].replace("refs/heads/", "", 1)
+        elif line.startswith("prunable"):
+            current["prunable"] = True
+
+    return worktrees
+
+
+def list_engineer_branches(cwd: str = None) -> list:
+    """List local task-NNN-eng-K branches."""
+    output = git_output(
+        "for-each-ref", "--format=%(refname:short)", "refs/heads/task-*", cwd=cwd
+    )
+    return [b for b in output.split("\n") if ENGINEER_BRANCH_RE.match(b)]
+
+
+def branch_exists(branch: str, cwd: str = None) -> bool:
+    """Check if a local branch exists."""
+    result = run_git("rev-parse", "--verify", "--quiet", f"refs/heads/{branch}", cwd=cwd)
+    return result.returncode == 0
+
+
+def is_merged(branch: str, into: str = "HEAD", cwd: str = None) -> bool:
+    """Check if a branch is fully merged into another ref."""
+    result = run_git("merge-base", "--is-ancestor", branch, into, cwd=cwd)
+    return result.returncode == 0
+
+
+def rev_parse(ref: str, cwd: str = None) -> Optional[str]:
+    """Resolve a ref to a commit SHA (None if it does not exist)."""
+    sha = git_output("rev-parse", "--verify", "--quiet", f"{ref}^{{commit}}", cwd=cwd)
+    return sha or None
+
+
+def merge_base(a: str, b: str, cwd: str = None) -> Optional[str]:
+    """Return the best common ancestor of two refs (None if unrelated)."""
+    return git_output("merge-base", a, b, cwd=cwd) or None
+
+
+def count_commits(rev_range: str, cwd: str = None) -> int:
+    """Count commits in a revision range such as base..branch."""
+    output = git_output("rev-list", "--count", rev_range, cwd=cwd)
+    return int(output) if output else 0
+
+
+def delete_branch(branch: str, cwd: str = None) -> bool:
+    """Force-delete a local branch."""
+    return run_git("branch", "-D", branch, cwd=cwd).returncode == 0
+
+
+def count_refs(cwd: str = None) -> int:
+    """Count all refs in the repository."""
+    output = git_output("for-each-ref", "--format=%(refname)", cwd=cwd)
+    return len(output.split("\n")) if output else 0
+
+
+def main_branch(cwd: str = None) -> Optional[str]:
+    """Return the name of the main branch (main or master)."""
+    for name in ("main", "master"):
+        if branch_exists(name, cwd=cwd):
+            return name
+    return None
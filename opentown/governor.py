@@ -0,0 +1,530 @@
+"""Rate-limit governor - shared request/token budget for all agents.
+
+All agents draw from one token bucket kept in .town/governor.json and
+guarded by an flock, so independent processes share a single budget.
+Concurrency is adapted with AIMD: every clean response grows the limit by
+1/limit, every throttle event halves it, and failed requests leave it alone.
+Token costs start as a request-size estimate and are corrected from the
+"usage" the upstream reports, when it reports one.
+"""
+
+import fcntl
+import http.client
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlsplit
+from .persistence import get_town
+
+DEFAULT_CONFIG = {
+    "requests_per_minute": 60,
+    "tokens_per_minute": 200000,
+    "initial_concurrency": 4,
+    "min_concurrency": 1,
+    "max_concurrency": 32,
+    "lease_ttl": 600,
+    "port": None,
+}
+THROTTLE_STATUSES = (429, 503, 529)
+PROXY_WAIT = 300  # seconds a proxied request may wait for budget before a 429
+USAGE_FIELDS = ("input_tokens", "output_tokens", "prompt_tokens", "completion_tokens")
+MAX_USAGE_LINE = 1 << 20  # longer response lines are not scanned for usage
+
+
+class GovernorServer(ThreadingHTTPServer):
+    """Threaded HTTP server sized for many concurrent agents."""
+
+    request_queue_size = 128
+    daemon_threads = True
+
+
+def get_governor_dir(governor_dir: Path = None) -> Path:
+    """Get the directory holding governor state."""
+    return Path(governor_dir) if governor_dir else get_town().path
+
+
+@contextmanager
+def locked_state(governor_dir: Path = None):
+    """Load governor state under an exclusive lock and save it on exit."""
+    root = get_governor_dir(governor_dir)
+    root.mkdir(parents=True, exist_ok=True)
+    state_path = root / "governor.json"
+
+    with open(root / "governor.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            state = json.loads(state_path.read_text()) if state_path.exists() else {}
+            state = init_state(state)
+            yield state
+            tmp = state_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(state, indent=2))
+            tmp.replace(state_path)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def init_state(state: dict) -> dict:
+    """Fill in missing governor fields with defaults."""
+    config = {**DEFAULT_CONFIG, **state.get("config", {})}
+    state["config"] = config
+    state.setdefault("requests", float(config["requests_per_minute"]))
+    state.setdefault("tokens", float(config["tokens_per_minute"]))
+    state.setdefault("limit", float(config["initial_concurrency"]))
+    state.setdefault("updated_at", time.time())
+    state.setdefault("in_flight", {})
+    state.setdefault("roles", {})
+    return state
+
+
+def refill(state: dict, now: float) -> None:
+    """Refill both buckets for the time elapsed since the last update."""
+    config = state["config"]
+    elapsed = max(0.0, now - state["updated_at"])
+    state["requests"] = min(
+        config["requests_per_minute"],
+        state["requests"] + elapsed * config["requests_per_minute"] / 60,
+    )
+    state["tokens"] = min(
+        config["tokens_per_minute"],
+        state["tokens"] + elapsed * config["tokens_per_minute"] / 60,
+    )
+    state["updated_at"] = now
+
+    # Leases from crashed agents would otherwise pin concurrency forever.
+    ttl = config["lease_ttl"]
+    for lease_id, lease in list(state["in_flight"].items()):
+        if now - lease["started_at"] > ttl:
+            del state["in_flight"][lease_id]
+
+
+def role_stats(state: dict, role: str) -> dict:
+    """Get (creating if needed) the accounting entry for a role."""
+    return state["roles"].setdefault(
+        role,
+        {"requests": 0, "tokens": 0, "throttles": 0, "wait_seconds": 0.0},
+    )
+
+
+def try_acquire(role: str, tokens: int = 0, governor_dir: Path = None) -> Optional[str]:
+    """Take one request and tokens from the budget. Returns a lease id or None."""
+    with locked_state(governor_dir) as state:
+        now = time.time()
+        refill(state, now)
+        tokens = min(tokens, state["config"]["tokens_per_minute"])
+
+        if (
+            len(state["in_flight"]) >= int(state["limit"])
+            or state["requests"] < 1
+            or state["tokens"] < tokens
+        ):
+            return None
+
+        state["requests"] -= 1
+        state["tokens"] -= tokens
+        lease_id = uuid.uuid4().hex[:12]
+        state["in_flight"][lease_id] = {
+            "role": role,
+            "tokens": tokens,
+            "started_at": now,
+        }
+        stats = role_stats(state, role)
+        stats["requests"] += 1
+        stats["tokens"] += tokens
+        return lease_id
+
+
+def acquire(
+    role: str,
+    tokens: int = 0,
+    timeout: float = None,
+    poll: float = 0.1,
+    governor_dir: Path = None,
+) -> str:
+    """Block until budget is available and return a lease id.
+
+    Raises TimeoutError if no budget frees up within timeout seconds.
+    """
+    started = time.time()
+    delay = poll
+    while True:
+        lease_id = try_acquire(role, tokens, governor_dir)
+        if lease_id:
+            waited = time.time() - started
+            if waited > 0:
+                with locked_state(governor_dir) as state:
+                    role_stats(state, role)["wait_seconds"] += waited
+            return lease_id
+        if timeout is not None and time.time() - started >= timeout:
+            raise TimeoutError(f"Governor: no budget for {role} within {timeout}s")
+        time.sleep(delay * random.uniform(0.5, 1.5))
+        delay = min(delay * 2, 2.0)
+
+
+def release(
+    lease_id: str,
+    throttled: bool = False,
+    tokens_used: int = None,
+    failed: bool = False,
+    governor_dir: Path = None,
+) -> None:
+    """Return a lease and feed the outcome into AIMD.
+
+    A failed request (no usable answer from upstream) says nothing about
+    capacity, so it neither grows nor shrinks the limit.
+    """
+    with locked_state(governor_dir) as state:
+        refill(state, time.time())
+        lease = state["in_flight"].pop(lease_id, None)
+        config = state["config"]
+
+        if lease and tokens_used is not None:
+            delta = tokens_used - lease["tokens"]
+            state["tokens"] = min(config["tokens_per_minute"], state["tokens"] - delta)
+            role_stats(state, lease["role"])["tokens"] += delta
+
+        if throttled:
+            state["limit"] = max(config["min_concurrency"], state["limit"] / 2)
+            state["requests"] = min(state["requests"], 0.0)
+            if lease:
+                role_stats(state, lease["role"])["throttles"] += 1
+        elif not failed:
+            state["limit"] = min(
+                config["max_concurrency"], state["limit"] + 1 / state["limit"]
+            )
+
+
+@contextmanager
+def governed(role: str, tokens: int = 0, governor_dir: Path = None):
+    """Hold a lease for the duration of one LLM request.
+
+    The yielded dict can be updated with "throttled", "tokens_used" and
+    "failed" before the block exits; an exception marks the request failed.
+    """
+    lease_id = acquire(role, tokens, governor_dir=governor_dir)
+    outcome = {"throttled": False, "tokens_used": None, "failed": False}
+    try:
+        yield outcome
+    except BaseException:
+        outcome["failed"] = True
+        raise
+    finally:
+        release(lease_id, governor_dir=governor_dir, **outcome)
+
+
+def configure(governor_dir: Path = None, **options) -> dict:
+    """Update governor configuration. Returns the new config."""
+    with locked_state(governor_dir) as state:
+        for key, value in options.items():
+            if value is not None:
+                state["config"][key] = value
+        config = state["config"]
+        state["limit"] = min(
+            max(state["limit"], config["min_concurrency"]), config["max_concurrency"]
+        )
+        return dict(config)
+
+
+def get_status(governor_dir: Path = None) -> dict:
+    """Return a snapshot of governor state."""
+    with locked_state(governor_dir) as state:
+        refill(state, time.time())
+        return json.loads(json.dumps(state))
+
+
+def governor_url(role: str, governor_dir: Path = None) -> Optional[str]:
+    """Base URL agents of a role should use, if the proxy is configured."""
+    path = get_governor_dir(governor_dir) / "governor.json"
+    if not path.exists():
+        return None
+    port = json.loads(path.read_text()).get("config", {}).get("port")
+    return f"http://127.0.0.1:{port}/{role}" if port else None
+
+
+def estimate_tokens(body: bytes) -> int:
+    """Rough token estimate for a request body (about 4 bytes per token)."""
+    return len(body) // 4
+
+
+class UsageMeter:
+    """Collect token usage from a JSON or server-sent-events response.
+
+    Chunks are scanned line by line as they stream past, so nothing is
+    buffered beyond one line. Streams report usage in several events
+    (input with the first, cumulative output with the last), so each field
+    keeps its largest value.
+    """
+
+    def __init__(self):
+        self.partial = b""
+        self.counts = {}
+
+    def feed(self, chunk: bytes) -> None:
+        *lines, self.partial = (self.partial + chunk).split(b"\n")
+        for line in lines:
+            self.scan(line)
+        if len(self.partial) > MAX_USAGE_LINE:
+            self.partial = b""
+
+    def scan(self, line: bytes) -> None:
+        if b'"usage"' not in line:
+            return
+        line = line.strip()
+        if line.startswith(b"data:"):
+            line = line[len(b"data:") :]
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return
+        if not isinstance(event, dict):
+            return
+        message = event.get("message")
+        if isinstance(message, dict):
+            usages = (event.get("usage"), message.get("usage"))
+        else:
+            usages = (event.get("usage"),)
+        for usage in usages:
+            if not isinstance(usage, dict):
+                continue
+            for field in USAGE_FIELDS:
+                value = usage.get(field)
+                if isinstance(value, int):
+                    self.counts[field] = max(self.counts.get(field, 0), value)
+
+    def total(self) -> Optional[int]:
+        """Tokens the upstream reported, or None if it reported no usage."""
+        self.scan(self.partial)
+        self.partial = b""
+        return sum(self.counts.values()) if self.counts else None
+
+
+def make_proxy_handler(upstream: str, governor_dir: Path = None):
+    """Build a request handler that forwards /<role>/... to upstream."""
+    target = urlsplit(upstream)
+    base_path = target.path.rstrip("/")
+
+    class ProxyHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def reply_error(self, status: int, message: str, retry_after: int = None):
+            body = json.dumps({"error": message}).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if retry_after:
+                self.send_header("Retry-After", str(retry_after))
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def forward(self):
+            role, _, rest = self.path.lstrip("/").partition("/")
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else None
+            self.close_connection = True
+
+            try:
+                lease_id = acquire(
+                    role or "unknown",
+                    estimate_tokens(body or b""),
+                    timeout=PROXY_WAIT,
+                    governor_dir=governor_dir,
+                )
+            except TimeoutError as e:
+                self.reply_error(429, str(e), retry_after=30)
+                return
+
+            throttled = False
+            failed = False
+            meter = UsageMeter()
+            try:
+                conn_cls = (
+                    http.client.HTTPSConnection
+                    if target.scheme == "https"
+                    else http.client.HTTPConnection
+                )
+                conn = conn_cls(target.netloc, timeout=600)
+                headers = {
+                    k: v
+                    for k, v in self.headers.items()
+                    if k.lower() not in ("host", "connection", "content-length")
+                }
+                try:
+                    conn.request(self.command, f"{base_path}/{rest}", body, headers)
+                    response = conn.getresponse()
+                except (OSError, http.client.HTTPException) as e:
+                    conn.close()
+                    failed = True
+                    self.reply_error(502, f"upstream {target.netloc}: {e}")
+                    return
+                throttled = response.status in THROTTLE_STATUSES
+
+                self.send_response(response.status)
+                for key, value in response.getheaders():
+                    if key.lower() not in ("transfer-encoding", "connection", "content-length"):
+                        self.send_header(key, value)
+                self.send_header("Connection", "close")
+                self.end_headers()
+                try:
+                    while True:
+                        chunk = response.read1(16384)
+                        if not chunk:
+                            break
+                        meter.feed(chunk)
+                        self.wfile.write(chunk)
+                        self.wfile.flush()
+                except (OSError, http.client.HTTPException):
+                    # Headers are out; all we can do is cut the stream short.
+                    failed = True
+                conn.close()
+            finally:
+                release(
+                    lease_id,
+                    throttled=throttled,
+                    tokens_used=meter.total(),
+                    failed=failed,
+                    governor_dir=governor_dir,
+                )
+
+        do_GET = forward
+        do_HEAD = forward
+        do_POST = forward
+        do_PUT = forward
+        do_PATCH = forward
+        do_DELETE = forward
+        do_OPTIONS = forward
+
+    return ProxyHandler
+
+
+def serve(upstream: str, port: int = 0, governor_dir: Path = None) -> ThreadingHTTPServer:
+    """Start the governor proxy in a background thread and record its port."""
+    server = GovernorServer(
+        ("127.0.0.1", port), make_proxy_handler(upstream, governor_dir)
+    )
+    configure(governor_dir, port=server.server_address[1])
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def stop_serving(governor_dir: Path = None) -> None:
+    """Clear the recorded proxy port."""
+    with locked_state(governor_dir) as state:
+        state["config"]["port"] = None
+
+
+def make_throttling_handler(capacity_per_second: float, latency: float):
+    """Stand-in LLM endpoint that answers 429 above capacity_per_second."""
+    lock = threading.Lock()
+    window = []
+
+    class ThrottlingHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            self.rfile.read(length)
+            now = time.time()
+            with lock:
+                while window and now - window[0] > 1.0:
+                    window.pop(0)
+                allowed = len(window) < capacity_per_second
+                if allowed:
+                    window.append(now)
+
+            if allowed:
+                time.sleep(latency)
+            payload = b'{"ok": true}' if allowed else b'{"error": "rate_limited"}'
+            self.send_response(200 if allowed else 429)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return ThrottlingHandler
+
+
+def bench(
+    workers: int = 16,
+    requests: int = 200,
+    capacity: float = 10.0,
+    latency: float = 0.05,
+    governor_dir: Path = None,
+) -> dict:
+    """Drive a local throttling endpoint through the governor and measure it.
+
+    The request bucket is sized well above the endpoint's capacity so the
+    run exercises AIMD backoff on throttle events rather than the bucket.
+    """
+    configure(
+        governor_dir,
+        requests_per_minute=int(capacity * 120),
+        max_concurrency=max(workers, 1),
+    )
+    endpoint = GovernorServer(
+        ("127.0.0.1", 0), make_throttling_handler(capacity, latency)
+    )
+    threading.Thread(target=endpoint.serve_forever, daemon=True).start()
+    proxy = serve(
+        f"http://127.0.0.1:{endpoint.server_address[1]}", governor_dir=governor_dir
+    )
+    proxy_port = proxy.server_address[1]
+
+    roles = ["engineer", "engineer", "engineer", "qa", "ceo"]
+    counter = {"left": requests, "ok": 0, "throttled": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def worker(index: int) -> None:
+        role = roles[index % len(roles)]
+        while True:
+            with lock:
+                if counter["left"] <= 0:
+                    return
+                counter["left"] -= 1
+            req = urllib.request.Request(
+                f"http://127.0.0.1:{proxy_port}/{role}/v1/messages",
+                data=b'{"prompt": "ping"}',
+                method="POST",
+            )
+            try:
+                urllib.request.urlopen(req).read()
+                key = "ok"
+            except urllib.error.HTTPError:
+                key = "throttled"
+            except OSError:
+                key = "errors"
+            with lock:
+                counter[key] += 1
+
+    started = time.time()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - started
+
+    proxy.shutdown()
+    endpoint.shutdown()
+    stop_serving(governor_dir)
+    status = get_status(governor_dir)
+
+    return {
+        "elapsed": elapsed,
+        "ok": counter["ok"],
+        "throttled": counter["throttled"],
+        "errors": counter["errors"],
+        "throughput": counter["ok"] / elapsed if elapsed else 0.0,
+        "limit": status["limit"],
+        "roles": status["roles"],
+    }
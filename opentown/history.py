@@ -0,0 +1,218 @@
+"""Task history - per-subtask metrics and engineer-count estimation."""
+
+import math
+import statistics
+import time
+from typing import Optional
+from .persistence import load_json, save_json, get_town, Town
+from .git import git_output
+
+HISTORY_WINDOW = 200  # most recent subtasks used for estimates
+
+
+def load_history(town: Town = None) -> dict:
+    """Load history.json."""
+    default = {"subtasks": [], "tasks": []}
+    return load_json(get_town(town).path / "history.json") or default
+
+
+def save_history(history: dict, town: Town = None) -> None:
+    """Save history.json."""
+    save_json(get_town(town).path / "history.json", history)
+
+
+def branch_changes(branch: str, base: str, town: Town = None) -> dict:
+    """Return {path: lines changed} for a branch relative to its fork point."""
+    cwd = get_town(town).project_dir
+    output = git_output("diff", "--numstat", f"{base}...{branch}", cwd=cwd)
+    changes = {}
+    for line in output.split("\n"):
+        parts = line.split("\t")
+        if len(parts) != 3:
+            continue
+        added, deleted, path = parts
+        # Binary files report "-" for both counts.
+        changes[path] = (int(added) if added.isdigit() else 0) + (
+            int(deleted) if deleted.isdigit() else 0
+        )
+    return changes
+
+
+def build_model(history: dict) -> Optional[dict]:
+    """Fit the estimation model from history. Returns None without data."""
+    subtasks = history.get("subtasks", [])[-HISTORY_WINDOW:]
+    durations = [s["duration"] for s in subtasks if s.get("duration")]
+    if not durations:
+        return None
+
+    duration = statistics.median(durations)
+
+    rates = [
+        s.get("conflicts", 0) / (s["parallelism"] - 1)
+        for s in subtasks
+        if s.get("parallelism", 1) > 1
+    ]
+    conflict_rate = statistics.mean(rates) if rates else 0.0
+
+    tasks = [
+        t for t in history.get("tasks", [])[-HISTORY_WINDOW:] if t.get("qa_seconds")
+    ]
+    qa_per_branch = (
+        statistics.median(t["qa_seconds"] / max(1, t["engineers"]) for t in tasks)
+        if tasks
+        else duration / 10
+    )
+    costs = [
+        max(0.0, t["qa_seconds"] - qa_per_branch * t["engineers"]) / t["conflicts"]
+        for t in tasks
+        if t.get("conflicts")
+    ]
+    conflict_cost = statistics.mean(costs) if costs else duration / 4
+
+    retries = [s.get("qa_retries", 0) for s in subtasks]
+    return {
+        "duration": duration,
+        "conflict_rate": conflict_rate,
+        "conflict_cost": conflict_cost,
+        "qa_per_branch": qa_per_branch,
+        "qa_retries": statistics.mean(retries) if retries else 0.0,
+        "samples": len(durations),
+    }
+
+
+def predict_seconds(model: dict, subtasks: int, engineers: int) -> float:
+    """Predict wall-clock seconds for a task with the given parallelism.
+
+    Engineers work through subtasks in waves; QA costs a fixed amount per
+    branch plus the expected conflicts, which grow with every pair of
+    concurrently edited branches. conflict_rate is the expected number of
+    shared files per unordered pair, so pairs are counted once.
+    """
+    waves = math.ceil(subtasks / engineers)
+    conflicts = engineers * (engineers - 1) / 2 * model["conflict_rate"]
+    qa = engineers * model["qa_per_branch"] + conflicts * model["conflict_cost"]
+    return waves * model["duration"] + qa * (1 + model["qa_retries"])
+
+
+def recommend(subtasks: int, history: dict = None, town: Town = None) -> Optional[dict]:
+    """Recommend an engineer count and predict completion time.
+
+    Returns None when there is no history to base a prediction on.
+    """
+    model = build_model(history or load_history(town))
+    if not model or subtasks < 1:
+        return None
+
+    best = min(
+        range(1, subtasks + 1),
+        key=lambda k: (round(predict_seconds(model, subtasks, k)), k),
+    )
+    return {
+        "engineers": best,
+        "seconds": predict_seconds(model, subtasks, best),
+        "full_parallel_seconds": predict_seconds(model, subtasks, subtasks),
+        "samples": model["samples"],
+    }
+
+
+def record_task(state: dict, task: dict, town: Town = None) -> dict:
+    """Append the finished task's metrics to history. Returns the task record."""
+    history = load_history(town)
+    now = time.time()
+    engineers = state.get("engineers", [])
+
+    changes = {}
+    for eng in engineers:
+        if eng.get("branch") and eng.get("base_sha"):
+            changes[eng["id"]] = branch_changes(eng["branch"], eng["base_sha"], town)
+
+    qa_retries = max(0, state.get("qa_runs", 1) - 1)
+    touched = {}
+    for eng_changes in changes.values():
+        for path in eng_changes:
+            touched[path] = touched.get(path, 0) + 1
+
+    for eng in engineers:
+        files = set(changes.get(eng["id"], {}))
+        others = set()
+        for other_id, other_changes in changes.items():
+            if other_id != eng["id"]:
+                others.update(other_changes)
+        conflicts = len(files & others)
+
+        subtask_ids = eng.get("subtask_ids") or [eng.get("subtask_id")]
+        started = eng.get("started_at")
+        finished = eng.get("finished_at") or state.get("qa_started_at") or now
+        # An engineer assigned several subtasks did them one after another.
+        duration = (finished - started) / len(subtask_ids) if started else None
+        history["subtasks"].append(
+            {
+                "task_id": task["id"],
+                "subtask_ids": subtask_ids,
+                "engineer": eng["id"],
+                "parallelism": len(engineers),
+                "duration": duration,
+                "diff_lines": sum(changes.get(eng["id"], {}).values()),
+                "files": len(files),
+                "conflicts": conflicts,
+                "qa_retries": qa_retries,
+                "recorded_at": now,
+            }
+        )
+
+    from .forecast import compare_forecast
+
+    starts = [eng["started_at"] for eng in engineers if eng.get("started_at")]
+    prediction = state.get("prediction") or {}
+    qa_started = state.get("qa_started_at")
+    record = {
+        "task_id": task["id"],
+        "subtasks": len(task.get("subtasks", [])),
+        "engineers": len(engineers),
+        "predicted_seconds": prediction.get("seconds"),
+        "recommended_engineers": prediction.get("engineers"),
+        "actual_seconds": (now - min(starts)) if starts else None,
+        "qa_seconds": (now - qa_started) if qa_started else None,
+        "conflicts": sum(1 for count in touched.values() if count > 1),
+        "qa_retries": qa_retries,
+        "forecast": compare_forecast(task, engineers, changes),
+        "recorded_at": now,
+    }
+    history["tasks"].append(record)
+    save_history(history, town)
+    return record
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    """Format seconds as e.g. 1h 5m or 42s."""
+    if seconds is None:
+        return "unknown"
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m {seconds}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes}m"
+
+
+def print_task_record(record: dict) -> None:
+    """Print predicted against actual for a finished task."""
+    actual = format_duration(record["actual_seconds"])
+    print(
+        f"History: {record['task_id']} took {actual} "
+        f"with {record['engineers']} engineers "
+        f"(predicted {format_duration(record['predicted_seconds'])})"
+    )
+    print(
+        f"History: {record['conflicts']} overlapping files, "
+        f"{record['qa_retries']} QA retries"
+    )
+    forecast = record.get("forecast")
+    if forecast:
+        print(
+            f"History: Forecast {forecast['predicted_conflicts']} conflicting "
+            f"engineer pairs, actual {forecast['actual_conflicts']} "
+            f"({forecast['caught_conflicts']} caught)"
+        )
@@ -0,0 +1,197 @@
+"""Engineer session logs - size-capped capture of tmux pane output."""
+
+import argparse
+import gzip
+import os
+import re
+import shlex
+import shutil
+import sys
+import time
+from collections import deque
+from pathlib import Path
+from .persistence import get_town, Town
+from . import tmux
+
+MAX_LOG_BYTES = 10 * 1024 * 1024
+KEEP_ROTATED = 5
+CHUNK_SIZE = 64 * 1024
+
+ANSI_RE = re.compile(rb"\x1b\[[0-?]*[ -/]*[@-~]|\x1b\][^\x07]*\x07|\x1b[@-Z\\-_]|\r")
+
+
+def get_log_dir(town: Town = None) -> Path:
+    """Get the session log directory."""
+    return get_town(town).path / "logs"
+
+
+def get_log_path(engineer_id: str, town: Town = None) -> Path:
+    """Get the live log file for an engineer."""
+    return get_log_dir(town) / f"{engineer_id}.log"
+
+
+def rotated_paths(log_path: Path, keep: int = KEEP_ROTATED) -> list:
+    """Return existing rotated logs, oldest first."""
+    paths = [log_path.with_name(f"{log_path.name}.{i}.gz") for i in range(keep, 0, -1)]
+    return [p for p in paths if p.exists()]
+
+
+def rotate(log_path: Path, keep: int = KEEP_ROTATED) -> None:
+    """Compress the live log into log.1.gz, shifting older files up."""
+    oldest = log_path.with_name(f"{log_path.name}.{keep}.gz")
+    if oldest.exists():
+        oldest.unlink()
+    for i in range(keep - 1, 0, -1):
+        src = log_path.with_name(f"{log_path.name}.{i}.gz")
+        if src.exists():
+            src.rename(log_path.with_name(f"{log_path.name}.{i + 1}.gz"))
+
+    with open(log_path, "rb") as src, gzip.open(
+        log_path.with_name(f"{log_path.name}.1.gz"), "wb"
+    ) as dst:
+        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+    log_path.unlink()
+
+
+def capture(
+    log_path: Path, max_bytes: int = MAX_LOG_BYTES, keep: int = KEEP_ROTATED
+) -> None:
+    """Copy stdin to log_path in fixed-size chunks, rotating at max_bytes."""
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    stdin = sys.stdin.buffer
+    out = open(log_path, "ab")
+    written = out.tell()
+
+    try:
+        while True:
+            chunk = stdin.read1(CHUNK_SIZE)
+            if not chunk:
+                break
+            out.write(chunk)
+            out.flush()
+            written += len(chunk)
+            if written >= max_bytes:
+                out.close()
+                rotate(log_path, keep)
+                out = open(log_path, "ab")
+                written = 0
+    finally:
+        out.close()
+
+
+def start_capture(session: str, engineer_id: str, town: Town = None) -> bool:
+    """Stream a tmux session's output into the engineer's log file."""
+    log_path = get_log_path(engineer_id, town).resolve()
+    command = " ".join(
+        shlex.quote(part)
+        for part in [sys.executable, "-m", "opentown.logs", str(log_path)]
+    )
+    return tmux.pipe_pane(session, command)
+
+
+def clean(data: bytes) -> str:
+    """Strip terminal control sequences from captured output."""
+    return ANSI_RE.sub(b"", data).decode("utf-8", errors="replace")
+
+
+def tail_lines(path: Path, count: int) -> list:
+    """Read the last count lines of a file by seeking backwards in blocks."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        blocks = []
+        newlines = 0
+        while pos > 0 and newlines <= count:
+            step = min(CHUNK_SIZE, pos)
+            pos -= step
+            f.seek(pos)
+            block = f.read(step)
+            newlines += block.count(b"\n")
+            blocks.append(block)
+
+    data = b"".join(reversed(blocks))
+    return clean(data).splitlines()[-count:]
+
+
+def iter_lines(engineer_id: str, town: Town = None):
+    """Yield every captured line for an engineer, oldest first."""
+    log_path = get_log_path(engineer_id, town)
+    for path in rotated_paths(log_path):
+        with gzip.open(path, "rb") as f:
+            for line in f:
+                yield clean(line).rstrip("\n")
+    if log_path.exists():
+        with open(log_path, "rb") as f:
+            for line in f:
+                yield clean(line).rstrip("\n")
+
+
+def read_logs(
+    engineer_id: str, lines: int = 50, pattern: str = None, town: Town = None
+) -> list:
+    """Return the last lines of an engineer's log, optionally filtered by regex."""
+    if pattern is None:
+        log_path = get_log_path(engineer_id, town)
+        if log_path.exists() and log_path.stat().st_size:
+            return tail_lines(log_path, lines)
+
+    regex = re.compile(pattern) if pattern else None
+    matches = deque(maxlen=lines)
+    for line in iter_lines(engineer_id, town):
+        if regex is None or regex.search(line):
+            matches.append(line)
+    return list(matches)
+
+
+def follow_logs(
+    engineer_id: str, pattern: str = None, interval: float = 0.5, town: Town = None
+):
+    """Yield new log lines as they are written, surviving rotation."""
+    log_path = get_log_path(engineer_id, town)
+    regex = re.compile(pattern) if pattern else None
+    f = None
+    inode = None
+    pending = b""
+
+    if log_path.exists():
+        f = open(log_path, "rb")
+        f.seek(0, os.SEEK_END)
+        inode = os.fstat(f.fileno()).st_ino
+
+    while True:
+        data = f.read(CHUNK_SIZE) if f else b""
+        if data:
+            pending += data
+            *complete, pending = pending.split(b"\n")
+            for raw in complete:
+                line = clean(raw)
+                if regex is None or regex.search(line):
+                    yield line
+            continue
+
+        try:
+            current = os.stat(log_path).st_ino
+        except FileNotFoundError:
+            current = None
+        if current is not None and current != inode:
+            # Rotated (or created): read the new file from the start.
+            if f:
+                f.close()
+            f = open(log_path, "rb")
+            inode = current
+            continue
+        time.sleep(interval)
+
+
+def main() -> None:
+    """Entry point used by tmux pipe-pane."""
+    parser = argparse.ArgumentParser(description="Capture tmux pane output.")
+    parser.add_argument("log_path")
+    parser.add_argument("--max-bytes", type=int, default=MAX_LOG_BYTES)
+    parser.add_argument("--keep", type=int, default=KEEP_ROTATED)
+    args = parser.parse_args()
+    capture(Path(args.log_path), args.max_bytes, args.keep)
+
+
+if __name__ == "__main__":
+    main()
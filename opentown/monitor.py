@@ -4,40 +4,70 @@ import time
 import subprocess
 from .persistence import (
     load_state,
-    save_state,
+    locked_state,
     load_tasks,
     get_next_task,
     set_task_status,
-    TOWN_DIR,
+    get_town,
+    Town,
 )
 from .roles.manager import monitor_progress
-from .roles.qa import run_qa
+from .roles.qa import run_qa, complete_task
 
 
-def run_pipeline(task_id: str = None) -> None:
+def resume_pipeline(town: Town = None) -> None:
+    """Reconcile state with git and tmux, then continue the pipeline."""
+    town = get_town(town)
+    from .recovery import reconcile, print_reconcile_report
+
+    print("OpenTown Pipeline: Resuming...")
+    report = reconcile(town=town)
+    print_reconcile_report(report)
+
+    phase = report["phase"]
+    if phase == "idle":
+        print("No task in flight. Run 'ot run' to start the next one.")
+        return
+    if phase == "complete":
+        complete_task(town)
+        return
+    if phase == "qa":
+        run_qa(town)
+
+    print("\nStarting monitor loop (Ctrl+C to stop)...")
+    try:
+        monitor_loop(town=town)
+    except KeyboardInterrupt:
+        print("\nPipeline monitoring stopped.")
+
+
+def run_pipeline(
+    task_id: str = None, resume: bool = False, town: Town = None
+) -> None:
     """Run the full pipeline with auto-transition."""
+    town = get_town(town)
+    if resume:
+        resume_pipeline(town)
+        return
+
     print("OpenTown Pipeline: Starting...")
 
-    state = load_state()
-    tasks = load_tasks()
+    state = load_state(town)
+    tasks = load_tasks(town)
 
     if not tasks or not tasks.get("tasks"):
         print("No tasks found. Run 'ot ceo' first.")
         return
 
     if not task_id:
-        next_task = get_next_task()
+        next_task = get_next_task(town)
         if next_task:
             task_id = next_task["id"]
         else:
             print("No pending tasks.")
             return
 
-    state["current_task"] = task_id
-    state["phase"] = "planning"
-    state["active_since"] = time.strftime("%Y-%m-%dT%H:%M:%SZ")
-    save_state(state)
-    set_task_status(task_id, "in_progress")
+    start_task(task_id, town)
 
     print(f"Pipeline: Working on task {task_id}")
     print("\nNext steps:")
@@ -49,33 +79,49 @@ def run_pipeline(task_id: str = None) -> None:
     print("\nStarting monitor loop (Ctrl+C to stop)...")
 
     try:
-        monitor_loop()
+        monitor_loop(town=town)
     except KeyboardInterrupt:
         print("\nPipeline monitoring stopped.")
 
 
-def monitor_loop() -> None:
-    """Background monitor that auto-transitions phases."""
-    while True:
-        state = load_state()
+def start_task(task_id: str, town: Town = None) -> None:
+    """Make task_id the current task and enter the planning phase."""
+    town = get_town(town)
+    with locked_state(town) as state:
+        state["current_task"] = task_id
+        state["phase"] = "planning"
+        state["active_since"] = time.strftime("%Y-%m-%dT%H:%M:%SZ")
+    set_task_status(task_id, "in_progress", town)
+
 
-        phase = state.get("phase", "idle")
+def monitor_step(town: Town = None) -> bool:
+    """Run one monitor pass. Returns True when the loop should stop."""
+    town = get_town(town)
+    state = load_state(town)
 
-        if phase == "implementation":
-            if monitor_progress():
-                print("\nAll engineers done! QA phase starting...")
-                run_qa()
-                break
+    phase = state.get("phase", "idle")
 
-        elif phase == "qa":
-            print("Waiting for QA to complete...")
+    if phase == "implementation":
+        if monitor_progress(town):
+            print("\nAll engineers done! QA phase starting...")
+            run_qa(town)
+            return True
 
-        elif phase == "complete":
-            print("Task complete! Run 'ot run' for next task.")
-            break
+    elif phase == "qa":
+        print("Waiting for QA to complete...")
 
-        elif phase == "idle":
-            print("No active task. Run 'ot ceo' to plan work.")
-            break
+    elif phase == "complete":
+        print("Task complete! Run 'ot run' for next task.")
+        return True
 
-        time.sleep(30)
+    elif phase == "idle":
+        print("No active task. Run 'ot ceo' to plan work.")
+        return True
+
+    return False
+
+
+def monitor_loop(interval: float = 30, town: Town = None) -> None:
+    """Background monitor that auto-transitions phases."""
+    while not monitor_step(town):
+        time.sleep(interval)
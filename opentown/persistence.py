@@ -1,12 +1,21 @@
 """Persistence layer - git-backed JSON state management."""
 
+import fcntl
+import hashlib
 import json
 import os
+import re
+import tempfile
+import time
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
 from typing import Optional, Any
+from .git import run_git
 
-TOWN_DIR = Path.cwd() / ".town"
+AGING_PER_HOUR = 1.0  # priority points a pending task gains per hour of waiting
+TASK_STATUSES = ("pending", "in_progress", "done")
+ENGINEER_STATUSES = ("working", "done", "failed")
 DESCRIBE_TEMPLATE = """# Project: {project_name}
 
 ## Context
@@ -26,22 +35,58 @@ Brief description of your project, tech stack, conventions.
 """
 
 
-def init_town(project_name: str = "") -> None:
+class ConflictError(Exception):
+    """A batch expected a different version than the one on disk."""
+
+
+class BatchError(ValueError):
+    """A batch operation failed validation; nothing was written."""
+
+
+class Town:
+    """Handle for one project: its repository and .town directory."""
+
+    def __init__(self, project_dir: Path = None):
+        self.project_dir = Path(project_dir or Path.cwd()).resolve()
+        self.path = self.project_dir / ".town"
+
+    @property
+    def name(self) -> str:
+        """Short name used in supervisor output."""
+        return self.project_dir.name
+
+    def session_name(self, engineer_id: str) -> str:
+        """tmux session name for an engineer, unique to this town."""
+        slug = re.sub(r"[^A-Za-z0-9_-]+", "_", self.name)
+        digest = hashlib.sha1(str(self.project_dir).encode()).hexdigest()[:6]
+        return f"ot-{slug}-{digest}-{engineer_id}"
+
+    def __repr__(self) -> str:
+        return f"Town({str(self.project_dir)!r})"
+
+
+def get_town(town: Town = None) -> Town:
+    """Return town, or the town for the current working directory."""
+    return town or Town()
+
+
+def init_town(project_name: str = "", town: Town = None) -> None:
     """Initialize .town directory structure."""
-    TOWN_DIR.mkdir(exist_ok=True)
-    (TOWN_DIR / "worktrees").mkdir(exist_ok=True)
+    town = get_town(town)
+    town.path.mkdir(exist_ok=True)
+    (town.path / "worktrees").mkdir(exist_ok=True)
 
-    describe_path = TOWN_DIR / "describe.md"
+    describe_path = town.path / "describe.md"
     if not describe_path.exists():
         describe_path.write_text(
             DESCRIBE_TEMPLATE.format(project_name=project_name or "My Project")
         )
 
-    tasks_path = TOWN_DIR / "tasks.json"
+    tasks_path = town.path / "tasks.json"
     if not tasks_path.exists():
-        save_tasks({"current_task": None, "tasks": []})
+        save_tasks({"current_task": None, "tasks": []}, town)
 
-    state_path = TOWN_DIR / "state.json"
+    state_path = town.path / "state.json"
     if not state_path.exists():
         save_state(
             {
@@ -50,7 +95,8 @@ def init_town(project_name: str = "") -> None:
                 "current_task": None,
                 "engineers": [],
                 "qa_status": "waiting",
-            }
+            },
+            town,
         )
 
 
@@ -62,113 +108,345 @@ def load_json(path: Path) -> Optional[dict]:
 
 
 def save_json(path: Path, data: dict) -> None:
-    """Save JSON file."""
-    path.write_text(json.dumps(data, indent=2))
+    """Save JSON file atomically (write a temp file, then rename over)."""
+    fd, tmp = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    try:
+        os.fchmod(fd, 0o644)
+        with os.fdopen(fd, "w") as f:
+            f.write(json.dumps(data, indent=2))
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+@contextmanager
+def locked_town(town: Town = None):
+    """Hold the town's write lock for tasks.json and state.json."""
+    town = get_town(town)
+    town.path.mkdir(parents=True, exist_ok=True)
+    with open(town.path / "town.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield town
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def save_versioned(path: Path, data: dict) -> None:
+    """Save a versioned document and bump its version.
+
+    data must carry the version it was loaded at; if the file has been
+    written since, ConflictError is raised and nothing is saved. Must be
+    called with the town lock held.
+    """
+    current = (load_json(path) or {}).get("version", 0)
+    loaded = data.get("version", 0)
+    if loaded != current:
+        raise ConflictError(
+            f"{path.name} is at version {current}, save based on version {loaded}"
+        )
+    data["version"] = current + 1
+    save_json(path, data)
+
+
+@contextmanager
+def locked_doc(name: str, town: Town = None):
+    """Load .town/<name>.json under the town lock and save it on exit if changed.
+
+    Yields None if the file does not exist. The block must not call anything
+    that takes the town lock itself (save_state, apply_batch, ...).
+    """
+    with locked_town(town) as town:
+        path = town.path / f"{name}.json"
+        data = load_json(path)
+        before = json.dumps(data, sort_keys=True)
+        yield data
+        if data is not None and json.dumps(data, sort_keys=True) != before:
+            save_versioned(path, data)
+
 
+def locked_tasks(town: Town = None):
+    """Read-modify-write tasks.json without losing concurrent changes."""
+    return locked_doc("tasks", town)
 
-def load_tasks() -> Optional[dict]:
+
+def locked_state(town: Town = None):
+    """Read-modify-write state.json without losing concurrent changes."""
+    return locked_doc("state", town)
+
+
+def load_tasks(town: Town = None) -> Optional[dict]:
     """Load tasks.json."""
-    return load_json(TOWN_DIR / "tasks.json")
+    return load_json(get_town(town).path / "tasks.json")
 
 
-def save_tasks(tasks: dict) -> None:
-    """Save tasks.json."""
-    save_json(TOWN_DIR / "tasks.json", tasks)
+def save_tasks(tasks: dict, town: Town = None) -> None:
+    """Save tasks.json. Raises ConflictError if it changed since loading."""
+    with locked_town(town) as town:
+        save_versioned(town.path / "tasks.json", tasks)
 
 
-def load_state() -> Optional[dict]:
+def load_state(town: Town = None) -> Optional[dict]:
     """Load state.json."""
-    return load_json(TOWN_DIR / "state.json")
+    return load_json(get_town(town).path / "state.json")
 
 
-def save_state(state: dict) -> None:
-    """Save state.json."""
-    save_json(TOWN_DIR / "state.json", state)
+def save_state(state: dict, town: Town = None) -> None:
+    """Save state.json. Raises ConflictError if it changed since loading."""
+    with locked_town(town) as town:
+        save_versioned(town.path / "state.json", state)
 
 
-def load_describe() -> str:
+def load_describe(town: Town = None) -> str:
     """Load describe.md content."""
-    describe_path = TOWN_DIR / "describe.md"
+    describe_path = get_town(town).path / "describe.md"
     if not describe_path.exists():
         return ""
     return describe_path.read_text()
 
 
-def save_describe(content: str) -> None:
+def save_describe(content: str, town: Town = None) -> None:
     """Save describe.md content."""
-    (TOWN_DIR / "describe.md").write_text(content)
+    (get_town(town).path / "describe.md").write_text(content)
 
 
-def get_worktree_path(engineer_id: str) -> Path:
+def get_worktree_path(engineer_id: str, town: Town = None) -> Path:
     """Get worktree path for an engineer."""
-    return TOWN_DIR / "worktrees" / engineer_id
+    return get_town(town).path / "worktrees" / engineer_id
+
+
+def get_session_name(engineer: dict, town: Town = None) -> str:
+    """Get the tmux session recorded for an engineer (or the town's default)."""
+    return engineer.get("tmux_session") or get_town(town).session_name(engineer["id"])
 
 
-def create_worktree(engineer_id: str, branch_name: str) -> Path:
+def create_worktree(engineer_id: str, branch_name: str, town: Town = None) -> Path:
     """Create a git worktree for an engineer."""
-    worktree_path = get_worktree_path(engineer_id)
+    town = get_town(town)
+    worktree_path = get_worktree_path(engineer_id, town)
     worktree_path.mkdir(parents=True, exist_ok=True)
 
-    os.system(
-        f"git worktree add {worktree_path} -b {branch_name} 2>/dev/null || git worktree add {worktree_path} {branch_name}"
-    )
+    cwd = town.project_dir
+    added = run_git("worktree", "add", str(worktree_path), "-b", branch_name, cwd=cwd)
+    if added.returncode != 0:
+        run_git("worktree", "add", str(worktree_path), branch_name, cwd=cwd)
 
     return worktree_path
 
 
-def remove_worktree(engineer_id: str) -> None:
+def remove_worktree(engineer_id: str, town: Town = None) -> None:
     """Remove a git worktree."""
-    worktree_path = get_worktree_path(engineer_id)
+    town = get_town(town)
+    worktree_path = get_worktree_path(engineer_id, town)
     if worktree_path.exists():
-        os.system(f"git worktree remove {worktree_path} --force 2>/dev/null")
+        run_git(
+            "worktree", "remove", str(worktree_path), "--force", cwd=town.project_dir
+        )
 
 
-def update_engineer_status(engineer_id: str, status: str, branch: str = None) -> None:
+def update_engineer_status(
+    engineer_id: str, status: str, branch: str = None, town: Town = None
+) -> None:
     """Update an engineer's status in state.json."""
-    state = load_state() or {}
-    engineers = state.get("engineers", [])
+    op = {"op": "set_engineer", "engineer": engineer_id, "status": status}
+    if branch:
+        op["branch"] = branch
+    apply_batch([op], town=town)
 
-    for eng in engineers:
-        if eng["id"] == engineer_id:
-            eng["status"] = status
-            if branch:
-                eng["branch"] = branch
-            break
-    else:
-        engineers.append(
-            {
-                "id": engineer_id,
-                "status": status,
-                "branch": branch,
-                "tmux_session": f"ot-{engineer_id}",
-            }
-        )
-
-    state["engineers"] = engineers
-    save_state(state)
 
+def effective_priority(task: dict, now: float = None) -> float:
+    """Priority including the aging bonus earned while queued."""
+    waited = (now or time.time()) - task.get("queued_at", now or time.time())
+    return task.get("priority", 0) + AGING_PER_HOUR * waited / 3600
 
-def get_next_task() -> Optional[dict]:
-    """Get the next pending task."""
-    tasks = load_tasks()
-    if not tasks:
-        return None
 
+def stamp_pending(tasks: dict, now: float = None) -> None:
+    """Record when each pending task started waiting, for aging."""
+    now = now or time.time()
     for task in tasks.get("tasks", []):
         if task["status"] == "pending":
-            return task
-    return None
+            task.setdefault("queued_at", now)
+
 
+def get_next_task(town: Town = None) -> Optional[dict]:
+    """Get the pending task with the highest effective priority.
 
-def set_task_status(task_id: str, status: str) -> None:
+    This is a single pass over tasks.json, which has to be read in full
+    anyway, so there is no separate ready queue to keep in sync.
+    """
+    with locked_tasks(town) as tasks:
+        if not tasks:
+            return None
+        now = time.time()
+        stamp_pending(tasks, now)
+        pending = [t for t in tasks.get("tasks", []) if t["status"] == "pending"]
+    return max(pending, key=lambda t: effective_priority(t, now), default=None)
+
+
+def set_task_priority(task_id: str, priority: int, town: Town = None) -> bool:
+    """Change a task's priority. Returns False if not found."""
+    try:
+        apply_batch(
+            [{"op": "set_priority", "task": task_id, "priority": priority}], town=town
+        )
+    except BatchError:
+        return False
+    return True
+
+
+def set_task_status(task_id: str, status: str, town: Town = None) -> None:
     """Update task status."""
-    tasks = load_tasks()
-    if not tasks:
-        return
+    try:
+        apply_batch(
+            [{"op": "set_status", "task": task_id, "status": status}], town=town
+        )
+    except BatchError:
+        pass
 
+
+def find_task(tasks: dict, task_id: str) -> dict:
+    """Return the task with task_id or raise ValueError."""
     for task in tasks.get("tasks", []):
         if task["id"] == task_id:
-            task["status"] = status
+            return task
+    raise ValueError(f"no task {task_id}")
+
+
+def op_set_status(op: dict, tasks: dict, state: dict) -> str:
+    """{"op": "set_status", "task", "status"}"""
+    if op["status"] not in TASK_STATUSES:
+        raise ValueError(f"status must be one of {', '.join(TASK_STATUSES)}")
+    task = find_task(tasks, op["task"])
+    task["status"] = op["status"]
+    stamp_pending({"tasks": [task]})
+    return "tasks"
+
+
+def op_set_priority(op: dict, tasks: dict, state: dict) -> str:
+    """{"op": "set_priority", "task", "priority"}"""
+    if not isinstance(op["priority"], int):
+        raise ValueError("priority must be an integer")
+    find_task(tasks, op["task"])["priority"] = op["priority"]
+    return "tasks"
+
+
+def op_set_subtask(op: dict, tasks: dict, state: dict) -> str:
+    """{"op": "set_subtask", "task", "subtask", "fields": {...}}"""
+    task = find_task(tasks, op["task"])
+    for subtask in task.get("subtasks", []):
+        if subtask["id"] == op["subtask"]:
+            if "id" in op["fields"]:
+                raise ValueError("subtask ids cannot be changed")
+            subtask.update(op["fields"])
+            return "tasks"
+    raise ValueError(f"no subtask {op['subtask']} in {op['task']}")
+
+
+def op_add_task(op: dict, tasks: dict, state: dict) -> str:
+    """{"op": "add_task", "task": {"id", "title", ...}}"""
+    task = dict(op["task"])
+    if not task.get("id") or not task.get("title"):
+        raise ValueError("new tasks need an id and a title")
+    if any(t["id"] == task["id"] for t in tasks.get("tasks", [])):
+        raise ValueError(f"task {task['id']} already exists")
+    task.setdefault("status", "pending")
+    task.setdefault("subtasks", [])
+    if task["status"] not in TASK_STATUSES:
+        raise ValueError(f"status must be one of {', '.join(TASK_STATUSES)}")
+    tasks.setdefault("tasks", []).append(task)
+    stamp_pending({"tasks": [task]})
+    return "tasks"
+
+
+def op_remove_task(op: dict, tasks: dict, state: dict) -> str:
+    """{"op": "remove_task", "task"}"""
+    task = find_task(tasks, op["task"])
+    if state.get("current_task") == task["id"]:
+        raise ValueError(f"{task['id']} is the current task")
+    tasks["tasks"].remove(task)
+    return "tasks"
+
+
+def op_set_engineer(op: dict, tasks: dict, state: dict) -> str:
+    """{"op": "set_engineer", "engineer", "status"?, "branch"?}"""
+    status = op.get("status")
+    if status is not None and status not in ENGINEER_STATUSES:
+        raise ValueError(f"status must be one of {', '.join(ENGINEER_STATUSES)}")
+    engineers = state.setdefault("engineers", [])
+    for eng in engineers:
+        if eng["id"] == op["engineer"]:
             break
-
-    save_tasks(tasks)
+    else:
+        eng = {
+            "id": op["engineer"],
+            "status": status,
+            "branch": None,
+            "tmux_session": None,
+        }
+        engineers.append(eng)
+    if status is not None:
+        eng["status"] = status
+    if op.get("branch"):
+        eng["branch"] = op["branch"]
+    return "state"
+
+
+BATCH_OPS = {
+    "set_status": op_set_status,
+    "set_priority": op_set_priority,
+    "set_subtask": op_set_subtask,
+    "add_task": op_add_task,
+    "remove_task": op_remove_task,
+    "set_engineer": op_set_engineer,
+}
+
+
+def apply_batch(
+    ops: list, expect: dict = None, dry_run: bool = False, town: Town = None
+) -> dict:
+    """Validate and apply many task/engineer changes with one write per file.
+
+    All ops are applied in memory under the town lock; if any fails, a
+    BatchError is raised and nothing is written. expect maps "tasks" and/or
+    "state" to the version the caller based its changes on; a mismatch
+    raises ConflictError. Returns {"applied": n, "versions": {...}}.
+    """
+    with locked_town(town) as town:
+        paths = {"tasks": town.path / "tasks.json", "state": town.path / "state.json"}
+        docs = {
+            "tasks": load_json(paths["tasks"]) or {"current_task": None, "tasks": []},
+            "state": load_json(paths["state"]) or {},
+        }
+
+        for name, version in (expect or {}).items():
+            if name not in docs:
+                raise BatchError(f"cannot expect a version of {name!r}")
+            current = docs[name].get("version", 0)
+            if current != version:
+                raise ConflictError(
+                    f"{name}.json is at version {current}, batch expected {version}"
+                )
+
+        changed = set()
+        for i, op in enumerate(ops):
+            handler = BATCH_OPS.get(op.get("op")) if isinstance(op, dict) else None
+            if handler is None:
+                raise BatchError(f"op {i}: unknown op {op!r}")
+            try:
+                changed.add(handler(op, docs["tasks"], docs["state"]))
+            except KeyError as e:
+                raise BatchError(f"op {i} ({op['op']}): missing {e}") from None
+            except (ValueError, TypeError) as e:
+                raise BatchError(f"op {i} ({op['op']}): {e}") from None
+
+        if not dry_run:
+            for name in changed:
+                save_versioned(paths[name], docs[name])
+
+    return {
+        "applied": len(ops),
+        "versions": {name: doc.get("version", 0) for name, doc in docs.items()},
+    }
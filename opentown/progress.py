@@ -0,0 +1,195 @@
+"""Engineer progress - batched git status for all engineer branches.
+
+Status for every task-*-eng-* branch is gathered with a fixed number of git
+calls regardless of how many engineers there are, and cached per
+(branch SHA, base SHA) so unchanged branches cost a single for-each-ref.
+"""
+
+import time
+from .persistence import load_json, save_json, get_town, Town
+from .git import run_git, git_output, main_branch, ENGINEER_BRANCH_RE
+
+
+def get_cache_path(town: Town = None):
+    """Get the branch status cache file."""
+    return get_town(town).path / "cache" / "branch_status.json"
+
+
+def read_refs(base: str, cwd=None) -> tuple:
+    """Read engineer branch heads and the base head in one for-each-ref."""
+    output = git_output(
+        "for-each-ref",
+        "--format=%(refname:short)%09%(objectname)%09%(committerdate:unix)",
+        f"refs/heads/{base}",
+        "refs/heads/task-*",
+        cwd=cwd,
+    )
+    base_sha = None
+    refs = {}
+    for line in output.split("\n"):
+        if not line:
+            continue
+        name, sha, date = line.split("\t")
+        if name == base:
+            base_sha = sha
+        elif ENGINEER_BRANCH_RE.match(name):
+            refs[name] = {"sha": sha, "last_commit": int(date or 0)}
+    return base_sha, refs
+
+
+def walk_branches(heads: list, base: str, cwd=None) -> dict:
+    """Count commits ahead and find the fork point for each head.
+
+    A single rev-list lists every commit reachable from the heads but not
+    from base; the per-head walks run in memory and stop at the first
+    commits outside that set, which are the fork points.
+    """
+    output = git_output("rev-list", "--parents", *heads, f"^{base}", cwd=cwd)
+    parents = {}
+    for line in output.split("\n"):
+        if line:
+            sha, *rest = line.split()
+            parents[sha] = rest
+
+    result = {}
+    for head in heads:
+        seen = set()
+        forks = set()
+        stack = [head]
+        while stack:
+            sha = stack.pop()
+            if sha in seen:
+                continue
+            seen.add(sha)
+            if sha in parents:
+                stack.extend(parents[sha])
+            else:
+                forks.add(sha)
+        result[head] = {"ahead": len(seen & parents.keys()), "forks": forks}
+
+    forks = {f for r in result.values() for f in r["forks"]}
+    behind = count_behind(forks, base, cwd)
+    for info in result.values():
+        forks = info.pop("forks")
+        # With several fork points (main merged into the branch) the most
+        # recent one, i.e. the one least behind, is the effective base.
+        info["fork"] = min(forks, key=lambda f: behind.get(f, 0))
+        info["behind"] = behind.get(info["fork"], 0)
+    return result
+
+
+def count_behind(forks: set, base: str, cwd=None) -> dict:
+    """Count commits on base that each fork point lacks.
+
+    Lists base's history down to the merge base of all forks once, then
+    subtracts each fork's ancestors in memory.
+    """
+    if not forks:
+        return {}
+    floor = git_output("merge-base", "--octopus", base, *forks, cwd=cwd)
+    args = ["rev-list", "--parents", base]
+    if floor:
+        args.append(f"^{floor}")
+    parents = {}
+    for line in git_output(*args, cwd=cwd).split("\n"):
+        if line:
+            sha, *rest = line.split()
+            parents[sha] = rest
+
+    behind = {}
+    for fork in forks:
+        seen = set()
+        stack = [fork]
+        while stack:
+            sha = stack.pop()
+            if sha in seen or sha not in parents:
+                continue
+            seen.add(sha)
+            stack.extend(parents[sha])
+        behind[fork] = len(parents) - len(seen)
+    return behind
+
+
+def diff_stats(pairs: list, cwd=None) -> dict:
+    """Shortstat each (head, fork) pair with one diff-tree --stdin call."""
+    if not pairs:
+        return {}
+    stdin = "".join(f"{head} {fork}\n" for head, fork in pairs)
+    result = run_git("diff-tree", "--stdin", "-r", "--shortstat", cwd=cwd, input=stdin)
+
+    stats = {head: {"files": 0, "insertions": 0, "deletions": 0} for head, _ in pairs}
+    current = None
+    for line in result.stdout.split("\n"):
+        line = line.strip()
+        if line in stats:
+            current = line
+        elif current and "changed" in line:
+            for part in line.split(","):
+                count, _, label = part.strip().partition(" ")
+                if label.startswith("file"):
+                    stats[current]["files"] = int(count)
+                elif label.startswith("insertion"):
+                    stats[current]["insertions"] = int(count)
+                elif label.startswith("deletion"):
+                    stats[current]["deletions"] = int(count)
+    return stats
+
+
+def collect_branch_status(base: str = None, town: Town = None) -> dict:
+    """Return {branch: status} for every engineer branch.
+
+    Status holds sha, ahead, behind, files, insertions, deletions and
+    last_commit (unix time).
+    """
+    town = get_town(town)
+    cwd = town.project_dir
+    base = base or main_branch(cwd=cwd)
+    if not base:
+        return {}
+
+    base_sha, refs = read_refs(base, cwd)
+    cache_path = get_cache_path(town)
+    cache = load_json(cache_path) or {}
+    statuses = {}
+    stale = {}
+
+    for name, ref in refs.items():
+        entry = cache.get(name)
+        if entry and entry["sha"] == ref["sha"] and entry.get("base_sha") == base_sha:
+            statuses[name] = entry
+        else:
+            stale[name] = ref
+
+    if stale:
+        heads = sorted({ref["sha"] for ref in stale.values()})
+        walked = walk_branches(heads, base_sha, cwd)
+        stats = diff_stats([(head, walked[head]["fork"]) for head in heads], cwd)
+        for name, ref in stale.items():
+            statuses[name] = {
+                "sha": ref["sha"],
+                "base_sha": base_sha,
+                "last_commit": ref["last_commit"],
+                "ahead": walked[ref["sha"]]["ahead"],
+                "behind": walked[ref["sha"]]["behind"],
+                **stats[ref["sha"]],
+            }
+
+    if stale or set(cache) != set(statuses):
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        save_json(cache_path, statuses)
+    return statuses
+
+
+def format_branch_status(status: dict, base: str = "main") -> str:
+    """One-line summary of a branch status."""
+    parts = [f"{status['ahead']} commits"]
+    if status["files"]:
+        parts.append(
+            f"+{status['insertions']}/-{status['deletions']} in {status['files']} files"
+        )
+    if status["ahead"] and status["last_commit"]:
+        minutes = int((time.time() - status["last_commit"]) // 60)
+        parts.append(f"last commit {minutes}m ago")
+    if status["behind"]:
+        parts.append(f"{status['behind']} behind {base}")
+    return ", ".join(parts)
@@ -0,0 +1,194 @@
+"""Crash recovery - rebuild pipeline state from git and tmux."""
+
+from pathlib import Path
+from .persistence import (
+    load_state,
+    locked_state,
+    load_tasks,
+    set_task_status,
+    get_worktree_path,
+    get_session_name,
+    create_worktree,
+    get_town,
+    Town,
+)
+from .git import (
+    list_worktrees,
+    branch_exists,
+    is_merged,
+    rev_parse,
+    count_commits,
+    main_branch,
+)
+from .executors import get_executor
+from . import tmux
+
+
+def inspect_engineer(
+    eng: dict, base: str, worktrees: dict, sessions: set, town: Town
+) -> dict:
+    """Collect what actually exists for one engineer."""
+    cwd = town.project_dir
+    branch = eng.get("branch")
+    exists = bool(branch) and branch_exists(branch, cwd=cwd)
+    fork = eng.get("base_sha")
+    head = rev_parse(branch, cwd=cwd) if exists else None
+
+    commits = 0
+    if exists:
+        rev_range = f"{fork}..{branch}" if fork else f"{base}..{branch}"
+        commits = count_commits(rev_range, cwd=cwd)
+
+    # A branch with no commits of its own is an ancestor of main trivially;
+    # only count it as merged when it carries work main already contains.
+    merged = (
+        exists
+        and base is not None
+        and (
+            head != fork
+            if fork
+            else commits == 0 and head != rev_parse(base, cwd=cwd)
+        )
+        and is_merged(branch, base, cwd=cwd)
+    )
+
+    path = get_worktree_path(eng["id"], town).resolve()
+    return {
+        "id": eng["id"],
+        "branch": branch,
+        "branch_exists": exists,
+        "commits": commits,
+        "merged": merged,
+        "worktree": worktrees.get(str(path)) == branch,
+        "session": get_session_name(eng, town) in sessions,
+    }
+
+
+def reconcile(dry_run: bool = False, town: Town = None) -> dict:
+    """Reconcile state.json with git and tmux.
+
+    Merged engineers are marked done, worktrees missing for unmerged work
+    are re-provisioned, and the phase is advanced to the furthest one the
+    evidence supports. Nothing that already succeeded is redone.
+    """
+    town = get_town(town)
+    state = load_state(town) or {}
+    tasks = load_tasks(town) or {}
+    task_id = state.get("current_task")
+    report = {"task": task_id, "engineers": [], "actions": [], "phase": "idle"}
+
+    if not task_id:
+        if not dry_run:
+            with locked_state(town) as state:
+                state["phase"] = "idle"
+        return report
+
+    task = next((t for t in tasks.get("tasks", []) if t["id"] == task_id), None)
+    if task is None:
+        report["actions"].append(f"task {task_id} no longer exists; resetting to idle")
+        if not dry_run:
+            with locked_state(town) as state:
+                state.update(phase="idle", current_task=None, engineers=[])
+        return report
+
+    base = main_branch(cwd=town.project_dir)
+    worktrees = {
+        str(Path(wt["path"]).resolve()): wt["branch"]
+        for wt in list_worktrees(cwd=town.project_dir)
+    }
+    # Only sessions started in this town's worktrees count; another project
+    # on the same tmux server may use the same engineer ids.
+    sessions = set(tmux.sessions_under(town.path / "worktrees"))
+    engineers = state.get("engineers", [])
+
+    for eng in engineers:
+        executor = get_executor(eng.get("executor", "local"), town)
+        # A finished worker job's branch may not have been fetched yet (the
+        # broker stopped mid-finish). collect only fast-forwards, and only
+        # for finished jobs, so unfinished or local work is left alone.
+        if not dry_run:
+            executor.collect(eng)
+        facts = inspect_engineer(eng, base, worktrees, sessions, town)
+        report["engineers"].append(facts)
+
+        if facts["merged"]:
+            if eng.get("status") != "done":
+                report["actions"].append(f"{eng['id']}: merged into {base}, marking done")
+                eng["status"] = "done"
+            eng["merged"] = True
+            continue
+
+        if executor.name != "local":
+            continue
+
+        if not facts["worktree"] and eng.get("branch"):
+            if not facts["branch_exists"]:
+                # Recreating it from HEAD would hide that the work is gone.
+                report["actions"].append(
+                    f"{eng['id']}: branch {eng['branch']} missing; not "
+                    "re-provisioning (respawn the engineer to start over)"
+                )
+                continue
+            report["actions"].append(
+                f"{eng['id']}: worktree missing, re-provisioning {eng['branch']}"
+            )
+            if not dry_run:
+                create_worktree(eng["id"], eng["branch"], town)
+
+        if eng.get("status") == "working" and not facts["session"]:
+            report["actions"].append(
+                f"{eng['id']}: no tmux session; relaunch the engineer in its worktree"
+            )
+
+    if dry_run:
+        phase = resumed_phase(task, engineers)
+    else:
+        # Engineers and the broker may have written state while git was
+        # inspected, so apply the findings to the current copy.
+        merged = {eng["id"] for eng in engineers if eng.get("merged")}
+        with locked_state(town) as current:
+            for eng in current.get("engineers", []):
+                if eng["id"] in merged:
+                    eng.update(status="done", merged=True)
+            phase = resumed_phase(task, current.get("engineers", []))
+            current["phase"] = phase
+            if phase == "qa":
+                current["qa_status"] = "ready"
+        if task.get("status") == "pending":
+            set_task_status(task_id, "in_progress", town)
+
+    if phase != state.get("phase"):
+        report["actions"].append(f"phase {state.get('phase')} -> {phase}")
+    report["phase"] = phase
+    return report
+
+
+def resumed_phase(task: dict, engineers: list) -> str:
+    """The furthest phase the engineers' recorded progress supports."""
+    if task.get("status") == "done":
+        return "complete"
+    if not engineers:
+        return "planning"
+    if all(eng.get("merged") for eng in engineers):
+        return "complete"
+    if all(eng.get("status") == "done" for eng in engineers):
+        return "qa"
+    return "implementation"
+
+
+def print_reconcile_report(report: dict) -> None:
+    """Print what reconciliation found and changed."""
+    print(f"Resume: Task {report['task'] or 'none'}")
+    for facts in report["engineers"]:
+        flags = []
+        flags.append("merged" if facts["merged"] else f"{facts['commits']} commits")
+        if not facts["branch_exists"]:
+            flags.append("branch missing")
+        if not facts["worktree"]:
+            flags.append("worktree missing")
+        if not facts["session"]:
+            flags.append("no session")
+        print(f"  - {facts['id']} ({facts['branch']}): {', '.join(flags)}")
+    for action in report["actions"]:
+        print(f"Resume: {action}")
+    print(f"Resume: Continuing from phase '{report['phase']}'")
@@ -6,8 +6,10 @@ from ..persistence import (
     load_describe,
     save_tasks,
     save_state,
-    TOWN_DIR,
+    get_town,
+    Town,
 )
+from ..governor import governor_url
 
 
 CEO_PROMPT = """
@@ -19,7 +21,8 @@ Rules:
 1. Each subtask should be completable by ONE engineer in ONE session
 2. Subtasks should be independent (parallelizable)
 3. Include clear acceptance criteria
-4. Write structured output to .town/tasks.json
+4. Set "priority" (higher runs sooner; default 0) for urgent work
+5. Write structured output to .town/tasks.json
 
 Format for tasks.json:
 {
@@ -29,6 +32,7 @@ Format for tasks.json:
       "id": "task-001",
       "title": "Task title from describe.md",
       "status": "pending",
+      "priority": 0,
       "phase": "planning",
       "subtasks": [
         {"id": "001-a", "desc": "Specific subtask", "assignee": null, "status": "pending", "branch": null},
@@ -79,11 +83,12 @@ def generate_task_id(existing_tasks: list) -> str:
     return f"task-{max_id + 1:03d}"
 
 
-def run_ceo() -> None:
+def run_ceo(town: Town = None) -> None:
     """Run CEO to process describe.md into tasks.json."""
+    town = get_town(town)
     print("CEO: Reading describe.md...")
 
-    content = load_describe()
+    content = load_describe(town)
     if not content:
         print("CEO: No describe.md found. Run 'ot init' first.")
         return
@@ -105,4 +110,7 @@ def run_ceo() -> None:
     for i, title in enumerate(task_titles, 1):
         print(f"  {i}. {title}")
     print("\nStart opencode and paste the instructions above.")
+    url = governor_url("ceo", town.path)
+    if url:
+        print(f"LLM endpoint for the CEO (via governor): {url}")
     print("The CEO will read describe.md and create tasks.json")
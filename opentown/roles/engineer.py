@@ -1,17 +1,24 @@
 """Engineer role - implements assigned subtasks."""
 
-import os
 import subprocess
+import time
 from pathlib import Path
 from ..persistence import (
     load_state,
-    save_state,
+    locked_state,
     load_tasks,
-    save_tasks,
-    create_worktree,
+    locked_tasks,
+    get_worktree_path,
     update_engineer_status,
-    TOWN_DIR,
+    get_town,
+    Town,
 )
+from ..bootstrap import bootstrap_worktree
+from ..executors import get_executor
+from ..logs import start_capture
+from ..governor import governor_url
+from ..git import rev_parse, merge_base
+from .. import tmux
 
 
 ENGINEER_PROMPT = """
@@ -27,9 +34,8 @@ Process:
 2. Work in your assigned worktree: {worktree_path}
 3. Implement the assigned subtask
 4. Commit your changes to your branch
-5. When complete, update .town/state.json:
-   - Find your engineer entry
-   - Set status to "done"
+5. When complete, mark yourself done (do not edit .town/state.json):
+   cd {project_dir} && ot done {engineer_id}
 
 Guidelines:
 - Follow existing code patterns
@@ -38,10 +44,29 @@ Guidelines:
 """
 
 
-def spawn_engineers(count: int) -> None:
-    """Spawn N engineer instances in tmux."""
-    state = load_state()
-    tasks = load_tasks()
+def assign_subtasks(subtasks: list, groups: list, count: int) -> list:
+    """Split subtasks among count engineers, keeping each group together.
+
+    Groups go largest first to the least-loaded engineer, so without groups
+    each engineer takes every count-th subtask.
+    """
+    by_id = {st["id"]: st for st in subtasks}
+    grouped = {sid for group in groups for sid in group}
+    units = [[by_id[sid] for sid in group if sid in by_id] for group in groups]
+    units += [[st] for st in subtasks if st["id"] not in grouped]
+
+    assignments = [[] for _ in range(count)]
+    for unit in sorted((u for u in units if u), key=len, reverse=True):
+        min(assignments, key=len).extend(unit)
+    return assignments
+
+
+def spawn_engineers(count: int, town: Town = None, executor=None) -> None:
+    """Spawn N engineer instances on the town's executor (tmux by default)."""
+    town = get_town(town)
+    executor = get_executor(executor, town)
+    state = load_state(town)
+    tasks = load_tasks(town)
 
     if not state or not tasks:
         print("No state or tasks. Run 'ot ceo' first.")
@@ -64,48 +89,100 @@ def spawn_engineers(count: int) -> None:
 
     subtasks = current_task.get("subtasks", [])
 
-    print(f"Spawning {count} engineers for task {current_task_id}...")
+    if count < 1:
+        print("Engineer count must be at least 1.")
+        return
+
+    print(
+        f"Spawning {count} engineers for task {current_task_id} "
+        f"({executor.name} executor)..."
+    )
+    base_sha = rev_parse("HEAD", cwd=town.project_dir)
 
     engineers = []
-    for i in range(count):
+    assignments = assign_subtasks(subtasks, current_task.get("groups", []), count)
+    for i, assigned in enumerate(assignments):
         engineer_id = f"eng-{i + 1}"
-        subtask = subtasks[i] if i < len(subtasks) else None
+        subtask = assigned[0] if assigned else None
         branch_name = f"{current_task_id}-eng-{i + 1}"
 
-        worktree_path = create_worktree(engineer_id, branch_name)
+        worktree_path = executor.prepare(engineer_id, branch_name, base_sha)
+        # An existing branch is reused as is; record where it forks from
+        # HEAD, not HEAD itself, so recovery can tell if it merged.
+        cwd = town.project_dir
+        fork_sha = merge_base(branch_name, base_sha, cwd=cwd) or base_sha
+        bootstrap = bootstrap_worktree(worktree_path, town) if worktree_path else {}
 
         engineer = {
             "id": engineer_id,
             "status": "working",
             "branch": branch_name,
-            "tmux_session": f"ot-{engineer_id}",
+            "tmux_session": town.session_name(engineer_id),
+            "executor": executor.name,
             "subtask_id": subtask["id"] if subtask else None,
+            "subtask_ids": [st["id"] for st in assigned],
+            "base_sha": fork_sha,
+            "started_at": time.time(),
         }
         engineers.append(engineer)
 
-        if subtask:
-            subtask["assignee"] = engineer_id
-            subtask["branch"] = branch_name
+        for st in assigned:
+            st["assignee"] = engineer_id
+            st["branch"] = branch_name
 
         print(f"  Created: {engineer_id} on branch {branch_name}")
-        print(f"    Worktree: {worktree_path}")
-
-    state["engineers"] = engineers
-    state["phase"] = "implementation"
-    save_state(state)
-    save_tasks(tasks)
-
+        if fork_sha != base_sha:
+            print(f"    Reusing existing branch (forked at {fork_sha[:8]})")
+        if len(assigned) > 1:
+            print(f"    Subtasks: {', '.join(st['id'] for st in assigned)}")
+        if worktree_path:
+            print(f"    Worktree: {worktree_path}")
+        for recipe, outcome in bootstrap.items():
+            print(f"    Bootstrap {recipe}: {outcome}")
+
+    with locked_state(town) as state:
+        state["engineers"] = engineers
+        state["phase"] = "implementation"
+        state["qa_runs"] = 0
+        state.pop("qa_started_at", None)
+    placed = {st["id"]: st for group in assignments for st in group}
+    with locked_tasks(town) as tasks:
+        task = next(t for t in tasks["tasks"] if t["id"] == current_task_id)
+        for st in task.get("subtasks", []):
+            if st["id"] in placed:
+                st["assignee"] = placed[st["id"]]["assignee"]
+                st["branch"] = placed[st["id"]]["branch"]
+
+    for engineer, assigned in zip(engineers, assignments):
+        executor.launch(engineer, assigned)
+
+    if executor.name == "worker":
+        from ..broker import broker_url
+
+        url = broker_url(town) or "http://<host>:<port>"
+        print(f"\nQueued {count} jobs. Run workers with: ot worker --broker {url}")
+        if not broker_url(town):
+            print("Start the broker first with 'ot broker serve'.")
     print(f"\nSpawned {count} engineers. They will work on their assigned subtasks.")
+    url = governor_url("engineer", town.path)
+    if url:
+        print(f"LLM endpoint for engineers (via governor): {url}")
     print("Monitor progress with 'ot status'")
 
 
 def create_engineer_session(
-    engineer_id: str, subtask_id: str, subtask_desc: str, branch: str
-) -> None:
-    """Create a tmux session for an engineer."""
-    worktree_path = TOWN_DIR / "worktrees" / engineer_id
-
-    session_name = f"ot-{engineer_id}"
+    engineer_id: str,
+    subtask_id: str,
+    subtask_desc: str,
+    branch: str,
+    town: Town = None,
+    session_name: str = None,
+) -> bool:
+    """Create a tmux session for an engineer. Returns False if tmux refused."""
+    town = get_town(town)
+    worktree_path = get_worktree_path(engineer_id, town)
+
+    session_name = session_name or town.session_name(engineer_id)
 
     prompt = ENGINEER_PROMPT.format(
         engineer_id=engineer_id,
@@ -113,20 +190,26 @@ def create_engineer_session(
         subtask_desc=subtask_desc,
         branch_name=branch,
         worktree_path=worktree_path,
+        project_dir=town.project_dir,
     )
 
-    tmux_cmd = f"tmux new-session -d -s {session_name} -c {worktree_path}"
-    os.system(tmux_cmd)
+    if not tmux.create_session(session_name, str(worktree_path)):
+        print(f"Could not create tmux session {session_name} (does it already exist?)")
+        return False
+    start_capture(session_name, engineer_id, town)
 
     print(f"Created tmux session: {session_name}")
     print(f"Attach with: tmux attach -t {session_name}")
+    print(f"Logs with: ot logs {engineer_id} --follow")
     print(f"\nPrompt for engineer:\n{prompt}")
+    return True
 
 
-def run_engineer(engineer_id: str) -> None:
+def run_engineer(engineer_id: str, town: Town = None) -> None:
     """Run an engineer session."""
-    state = load_state()
-    tasks = load_tasks()
+    town = get_town(town)
+    state = load_state(town)
+    tasks = load_tasks(town)
 
     engineer = None
     for eng in state.get("engineers", []):
@@ -150,6 +233,6 @@ def run_engineer(engineer_id: str) -> None:
         return
 
     print("\nTo start working, run:")
-    print(f"  cd {TOWN_DIR}/worktrees/{engineer_id}")
+    print(f"  cd {get_worktree_path(engineer_id, town)}")
     print("  opencode")
     print("\nThen paste your assignment instructions.")
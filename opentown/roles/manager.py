@@ -1,14 +1,17 @@
 """Manager role - coordinates work distribution and monitoring."""
 
 import time
+from ..history import recommend, format_duration
+from ..forecast import apply_forecast, print_forecast
 from ..persistence import (
     load_tasks,
     save_tasks,
     load_state,
-    save_state,
+    locked_state,
     get_next_task,
     set_task_status,
-    TOWN_DIR,
+    get_town,
+    Town,
 )
 
 
@@ -31,21 +34,22 @@ Commands you can use:
 """
 
 
-def run_manager(task_id: str = None) -> None:
+def run_manager(task_id: str = None, town: Town = None) -> None:
     """Run manager coordination loop."""
+    town = get_town(town)
     print("Manager: Starting coordination...")
 
-    state = load_state()
-    tasks = load_tasks()
+    state = load_state(town)
+    tasks = load_tasks(town)
 
     if not tasks or not tasks.get("tasks"):
         print("Manager: No tasks found. Run 'ot ceo' first.")
         return
 
     if task_id:
-        state["current_task"] = task_id
-        state["phase"] = "planning"
-        save_state(state)
+        with locked_state(town) as state:
+            state["current_task"] = task_id
+            state["phase"] = "planning"
 
     current_task = None
     for task in tasks["tasks"]:
@@ -54,11 +58,11 @@ def run_manager(task_id: str = None) -> None:
             break
 
     if not current_task:
-        next_task = get_next_task()
+        next_task = get_next_task(town)
         if next_task:
             current_task = next_task
             state["current_task"] = current_task["id"]
-            set_task_status(current_task["id"], "in_progress")
+            set_task_status(current_task["id"], "in_progress", town)
             print(
                 f"Manager: Picked up task {current_task['id']}: {current_task['title']}"
             )
@@ -71,8 +75,33 @@ def run_manager(task_id: str = None) -> None:
         print(f"Manager: Task {current_task['id']} has no subtasks. Skipping.")
         return
 
-    engineer_count = len(subtasks)
-    print(f"Manager: Task has {engineer_count} subtasks")
+    if "forecast" not in current_task:
+        forecast = apply_forecast(current_task["id"], town=town)
+        print_forecast(forecast, current_task)
+
+    # Subtasks forecast to overlap may have been grouped onto one engineer.
+    units = len(current_task.get("groups") or subtasks)
+    engineer_count = units
+    print(f"Manager: Task has {len(subtasks)} subtasks")
+
+    estimate = recommend(units, town=town)
+    if estimate:
+        engineer_count = estimate["engineers"]
+        print(
+            f"Manager: History ({estimate['samples']} subtasks) suggests "
+            f"{engineer_count} engineers, predicted "
+            f"{format_duration(estimate['seconds'])} "
+            f"(vs {format_duration(estimate['full_parallel_seconds'])} "
+            f"with {units})"
+        )
+    else:
+        print("Manager: No history yet; using one engineer per subtask")
+    with locked_state(town) as state:
+        state["current_task"] = current_task["id"]
+        state.pop("prediction", None)
+        if estimate:
+            state["prediction"] = estimate
+
     print(f"Manager: Run 'ot spawn {engineer_count}' to create engineer instances")
 
     print("\n" + "=" * 60)
@@ -86,24 +115,26 @@ def run_manager(task_id: str = None) -> None:
     print("=" * 60)
 
 
-def monitor_progress() -> bool:
+def monitor_progress(town: Town = None) -> bool:
     """Check if all engineers are done. Returns True if QA should run."""
-    state = load_state()
+    with locked_state(town) as state:
+        if state.get("phase") != "implementation":
+            return False
 
-    if state.get("phase") != "implementation":
-        return False
+        engineers = state.get("engineers", [])
+        if not engineers:
+            return False
 
-    engineers = state.get("engineers", [])
-    if not engineers:
-        return False
+        now = time.time()
+        for eng in engineers:
+            if eng.get("status") == "done" and not eng.get("finished_at"):
+                eng["finished_at"] = now
 
-    all_done = all(eng.get("status") == "done" for eng in engineers)
+        if not all(eng.get("status") == "done" for eng in engineers):
+            return False
 
-    if all_done:
         state["phase"] = "qa"
         state["qa_status"] = "ready"
-        save_state(state)
-        print("Manager: All engineers done! Transitioning to QA phase.")
-        return True
-
-    return False
+        state["qa_started_at"] = now
+    print("Manager: All engineers done! Transitioning to QA phase.")
+    return True
@@ -4,14 +4,17 @@ import os
 import subprocess
 from ..persistence import (
     load_state,
-    save_state,
+    locked_state,
     load_tasks,
-    save_tasks,
+    set_task_status,
     load_describe,
     save_describe,
-    remove_worktree,
-    TOWN_DIR,
+    get_town,
+    Town,
 )
+from ..governor import governor_url
+from ..history import record_task, print_task_record
+from ..executors import get_executor
 
 
 QA_PROMPT = """
@@ -39,10 +42,11 @@ Then merge each branch one by one.
 """
 
 
-def run_qa() -> None:
+def run_qa(town: Town = None) -> None:
     """Run QA merge process."""
-    state = load_state()
-    tasks = load_tasks()
+    town = get_town(town)
+    state = load_state(town)
+    tasks = load_tasks(town)
 
     if not state or not tasks:
         print("No state or tasks found.")
@@ -61,6 +65,8 @@ def run_qa() -> None:
         return
 
     current_task_id = state.get("current_task")
+    with locked_state(town) as state:
+        state["qa_runs"] = state.get("qa_runs", 0) + 1
 
     print(f"QA: Starting merge process for task {current_task_id}")
     print(f"QA: Branches to merge: {', '.join(branches)}")
@@ -84,14 +90,19 @@ def run_qa() -> None:
         print("4. pytest  # run tests")
     print("5. git push origin main")
 
+    url = governor_url("qa", town.path)
+    if url:
+        print(f"\nLLM endpoint for QA (via governor): {url}")
+
     print("\nAfter successful merge, run:")
     print("  ot complete")
 
 
-def complete_task() -> None:
+def complete_task(town: Town = None) -> None:
     """Mark current task as complete and update describe.md."""
-    state = load_state()
-    tasks = load_tasks()
+    town = get_town(town)
+    state = load_state(town)
+    tasks = load_tasks(town)
 
     if not state or not tasks:
         print("No state or tasks found.")
@@ -105,29 +116,33 @@ def complete_task() -> None:
     task_title = None
     for task in tasks.get("tasks", []):
         if task["id"] == current_task_id:
-            task["status"] = "done"
             task_title = task["title"]
+            current_task = task
             break
 
     if not task_title:
         print(f"Task {current_task_id} not found.")
         return
 
-    save_tasks(tasks)
+    set_task_status(current_task_id, "done", town)
 
-    describe = load_describe()
+    describe = load_describe(town)
     lines = describe.split("\n")
 
     new_lines = []
     in_next = False
     added_to_done = False
 
+    done_line = f"- [x] {task_title}"
+    if done_line in lines:
+        added_to_done = True
+
     for line in lines:
         if "## Done" in line:
             in_next = False
             new_lines.append(line)
             if not added_to_done:
-                new_lines.append(f"- [x] {task_title}")
+                new_lines.append(done_line)
                 added_to_done = True
         elif "## Next" in line:
             in_next = True
@@ -137,16 +152,21 @@ def complete_task() -> None:
         else:
             new_lines.append(line)
 
-    save_describe("\n".join(new_lines))
+    save_describe("\n".join(new_lines), town)
 
-    for eng in state.get("engineers", []):
-        remove_worktree(eng["id"])
+    if state.get("engineers"):
+        print_task_record(record_task(state, current_task, town))
 
-    state["phase"] = "idle"
-    state["current_task"] = None
-    state["engineers"] = []
-    state["qa_status"] = "waiting"
-    save_state(state)
+    for eng in state.get("engineers", []):
+        get_executor(eng.get("executor", "local"), town).release(eng)
+
+    with locked_state(town) as state:
+        state["phase"] = "idle"
+        state["current_task"] = None
+        state["engineers"] = []
+        state["qa_status"] = "waiting"
+        for key in ("prediction", "qa_runs", "qa_started_at"):
+            state.pop(key, None)
 
     print(f"Task {current_task_id} marked as complete!")
     print("Run 'ot run' to process the next task.")
@@ -0,0 +1,355 @@
+"""Simulated engineers - load-test the control plane without real agents.
+
+Fake engineers make scripted commits in their worktrees and flip their
+status to "done" after sampled delays, with configurable failure, stall
+and conflict rates. The real spawn_engineers, monitor, run_qa and
+complete_task code drives them end to end against a throwaway repo.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from .executors import LocalExecutor
+from .persistence import remove_worktree
+
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "OpenTown Simulator",
+    "GIT_AUTHOR_EMAIL": "sim@opentown.local",
+    "GIT_COMMITTER_NAME": "OpenTown Simulator",
+    "GIT_COMMITTER_EMAIL": "sim@opentown.local",
+}
+
+
+def git(*args: str, cwd=None) -> subprocess.CompletedProcess:
+    """Run git with the simulator's identity."""
+    return subprocess.run(
+        ["git", *args],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        env={**os.environ, **GIT_ENV},
+    )
+
+
+def create_repo(path: Path) -> None:
+    """Create a throwaway git repo with one commit on main."""
+    path.mkdir(parents=True, exist_ok=True)
+    git("init", "-q", "-b", "main", cwd=path)
+    (path / "README.md").write_text("# Simulated project\n")
+    (path / "conflict.txt").write_text("base\n")
+    git("add", ".", cwd=path)
+    git("commit", "-q", "-m", "Initial commit", cwd=path)
+
+
+class Recorder:
+    """Collects latency samples per control-plane operation."""
+
+    def __init__(self):
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def measure(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self.lock:
+                self.samples.setdefault(name, []).append(elapsed)
+
+    def summary(self) -> dict:
+        result = {}
+        for name, values in self.samples.items():
+            values = sorted(values)
+            result[name] = {
+                "count": len(values),
+                "p50": statistics.median(values),
+                "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+                "max": values[-1],
+            }
+        return result
+
+
+class FakeEngineer(threading.Thread):
+    """One simulated engineer working in its worktree."""
+
+    def __init__(self, sim, engineer: dict, attempt: int):
+        super().__init__(daemon=True)
+        self.sim = sim
+        self.engineer = engineer
+        self.attempt = attempt
+
+    def run(self):
+        sim = self.sim
+        eng_id = self.engineer["id"]
+        delay = sim.rng_delay()
+        outcome = sim.rng_outcome()
+        time.sleep(delay)
+
+        if outcome == "stall" or sim.cancelled(eng_id, self.attempt):
+            return
+
+        if outcome == "ok":
+            worktree = sim.worktree_path(eng_id)
+            name = f"{eng_id}-{self.attempt}.txt"
+            (worktree / name).write_text(f"work by {eng_id}\n")
+            if sim.rng_conflict():
+                (worktree / "conflict.txt").write_text(f"changed by {eng_id}\n")
+            git("add", ".", cwd=worktree)
+            git("commit", "-q", "-m", f"Simulated work by {eng_id}", cwd=worktree)
+
+        status = "done" if outcome == "ok" else "failed"
+        with sim.lock:
+            if sim.cancelled(eng_id, self.attempt):
+                return
+            with sim.recorder.measure("update_engineer_status"):
+                sim.persistence.update_engineer_status(eng_id, status, town=sim.town)
+            if status == "done":
+                sim.last_done = time.perf_counter()
+
+
+class SimulatedExecutor(LocalExecutor):
+    """Local worktrees without tmux sessions; FakeEngineer threads do the work."""
+
+    def launch(self, engineer: dict, subtasks: list) -> None:
+        pass
+
+    def release(self, engineer: dict) -> None:
+        remove_worktree(engineer["id"], self.town)
+
+
+class Simulation:
+    """Drives tasks through the real control plane with fake engineers."""
+
+    def __init__(self, args, town=None):
+        from . import persistence
+
+        self.args = args
+        self.persistence = persistence
+        self.town = persistence.get_town(town)
+        self.random = random.Random(args.seed)
+        self.rng_lock = threading.Lock()
+        self.lock = threading.Lock()
+        self.recorder = Recorder()
+        self.attempts = {}
+        self.started_at = {}
+        self.last_done = None
+        self.counts = {
+            "restarts_failed": 0,
+            "restarts_stalled": 0,
+            "merge_conflicts": 0,
+        }
+
+    def rng_delay(self) -> float:
+        with self.rng_lock:
+            return self.random.expovariate(1 / self.args.delay)
+
+    def rng_outcome(self) -> str:
+        with self.rng_lock:
+            roll = self.random.random()
+        if roll < self.args.fail_rate:
+            return "fail"
+        if roll < self.args.fail_rate + self.args.stall_rate:
+            return "stall"
+        return "ok"
+
+    def rng_conflict(self) -> bool:
+        with self.rng_lock:
+            return self.random.random() < self.args.conflict_rate
+
+    def worktree_path(self, engineer_id: str) -> Path:
+        return self.persistence.get_worktree_path(engineer_id, self.town)
+
+    def cancelled(self, engineer_id: str, attempt: int) -> bool:
+        return self.attempts.get(engineer_id) != attempt
+
+    def launch(self, engineer: dict) -> None:
+        attempt = self.attempts.get(engineer["id"], 0) + 1
+        self.attempts[engineer["id"]] = attempt
+        self.started_at[engineer["id"]] = time.perf_counter()
+        FakeEngineer(self, engineer, attempt).start()
+
+    def supervise(self) -> None:
+        """Restart failed engineers and those stalled past the timeout."""
+        state = self.persistence.load_state(self.town)
+        now = time.perf_counter()
+        for eng in state.get("engineers", []):
+            if eng["status"] == "failed":
+                self.counts["restarts_failed"] += 1
+            elif (
+                eng["status"] == "working"
+                and now - self.started_at[eng["id"]] > self.args.stall_timeout
+            ):
+                self.counts["restarts_stalled"] += 1
+            else:
+                continue
+            self.persistence.update_engineer_status(
+                eng["id"], "working", town=self.town
+            )
+            self.launch(eng)
+
+    def merge_branches(self) -> None:
+        """Fake QA: merge every engineer branch, resolving conflicts as theirs."""
+        state = self.persistence.load_state(self.town)
+        repo = self.town.project_dir
+        for eng in state.get("engineers", []):
+            result = git("merge", "--no-edit", "-q", eng["branch"], cwd=repo)
+            if result.returncode != 0:
+                self.counts["merge_conflicts"] += 1
+                git("merge", "--abort", cwd=repo)
+                git("merge", "--no-edit", "-q", "-X", "theirs", eng["branch"], cwd=repo)
+
+    def run_task(self, task_id: str) -> None:
+        from .monitor import start_task, monitor_step
+        from .roles.engineer import spawn_engineers
+        from .roles.qa import complete_task
+
+        rec = self.recorder
+        town = self.town
+        self.last_done = None
+        with rec.measure("start_task"):
+            start_task(task_id, town)
+        with rec.measure("spawn_engineers"):
+            spawn_engineers(self.args.engineers, town, SimulatedExecutor(town))
+
+        for eng in self.persistence.load_state(town)["engineers"]:
+            self.launch(eng)
+
+        while True:
+            time.sleep(self.args.poll)
+            with self.lock:
+                with rec.measure("monitor_step"):
+                    finished = monitor_step(town)
+                if finished:
+                    break
+                self.supervise()
+
+        if self.last_done is not None:
+            rec.samples.setdefault("done_detection", []).append(
+                time.perf_counter() - self.last_done
+            )
+        with rec.measure("qa_merge"):
+            self.merge_branches()
+        with rec.measure("complete_task"):
+            complete_task(town)
+
+    def run(self) -> dict:
+        p = self.persistence
+        p.init_town("Simulation", self.town)
+        with p.locked_tasks(self.town) as tasks:
+            tasks["tasks"] = [
+                {
+                    "id": f"task-{i + 1:03d}",
+                    "title": f"Simulated task {i + 1}",
+                    "status": "pending",
+                    "subtasks": [
+                        {"id": f"{i + 1:03d}-{j + 1}", "desc": "simulated"}
+                        for j in range(self.args.engineers)
+                    ],
+                }
+                for i in range(self.args.tasks)
+            ]
+
+        started = time.perf_counter()
+        completed = 0
+        while True:
+            with self.recorder.measure("get_next_task"):
+                task = p.get_next_task(self.town)
+            if not task:
+                break
+            # The control plane is chatty; keep its prints out of the report.
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.run_task(task["id"])
+            completed += 1
+        elapsed = time.perf_counter() - started
+
+        return {
+            "tasks": completed,
+            "engineers": self.args.engineers,
+            "elapsed": elapsed,
+            "tasks_per_minute": completed / elapsed * 60 if elapsed else 0.0,
+            "subtasks_per_second": completed * self.args.engineers / elapsed
+            if elapsed
+            else 0.0,
+            **self.counts,
+            "latency": self.recorder.summary(),
+        }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Simulated engineer load test.")
+    parser.add_argument("--engineers", type=int, default=10)
+    parser.add_argument("--tasks", type=int, default=3)
+    parser.add_argument("--delay", type=float, default=1.0)
+    parser.add_argument("--fail-rate", type=float, default=0.05)
+    parser.add_argument("--stall-rate", type=float, default=0.02)
+    parser.add_argument("--conflict-rate", type=float, default=0.1)
+    parser.add_argument("--stall-timeout", type=float, default=10.0)
+    parser.add_argument("--poll", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--keep", action="store_true", help="keep the throwaway repo")
+    parser.add_argument("--report", default=None, help="write the report as JSON")
+    return parser
+
+
+def simulate(options: list, keep: bool = False) -> dict:
+    """Create a throwaway repo and run the simulation against it in-process."""
+    from .persistence import Town
+
+    tmp = Path(tempfile.mkdtemp(prefix="opentown-sim-"))
+    repo = tmp / "repo"
+    create_repo(repo)
+
+    report = Simulation(build_parser().parse_args(options), Town(repo)).run()
+    report["repo"] = str(repo)
+    if not keep:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return report
+
+
+def print_report(report: dict) -> None:
+    """Print control-plane throughput and latency."""
+    print(
+        f"Simulated {report['tasks']} tasks x {report['engineers']} engineers "
+        f"in {report['elapsed']:.1f}s"
+    )
+    print(
+        f"Throughput: {report['tasks_per_minute']:.1f} tasks/min, "
+        f"{report['subtasks_per_second']:.1f} subtasks/s"
+    )
+    print(
+        f"Restarts: {report['restarts_failed']} failed, "
+        f"{report['restarts_stalled']} stalled; "
+        f"merge conflicts: {report['merge_conflicts']}"
+    )
+    print("Latency (ms):        count     p50     p95     max")
+    for name, stats in sorted(report["latency"].items()):
+        print(
+            f"  {name:<20}{stats['count']:>5} {stats['p50'] * 1000:>7.1f} "
+            f"{stats['p95'] * 1000:>7.1f} {stats['max'] * 1000:>7.1f}"
+        )
+
+
+def main() -> None:
+    """Run against a throwaway repo, never the current project."""
+    args = build_parser().parse_args()
+    report = simulate(sys.argv[1:], keep=args.keep)
+    print_report(report)
+    if args.report:
+        Path(args.report).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Supervisor - drive several projects from one process.
+
+Each pass visits every town once: idle towns pick their next task, towns in
+planning get engineers from a capacity budget shared by all towns, and towns
+in implementation get a monitor step. One loop replaces a monitor per repo.
+"""
+
+import time
+from pathlib import Path
+from .persistence import load_state, locked_state, load_tasks, get_next_task, Town
+from .history import recommend
+from .forecast import apply_forecast
+from .monitor import start_task, monitor_step
+from .roles.engineer import spawn_engineers
+
+
+def parse_towns(spec: str) -> list:
+    """Parse a comma-separated list of project directories into Towns."""
+    towns = []
+    for part in spec.split(","):
+        part = part.strip()
+        if part:
+            towns.append(Town(Path(part).expanduser()))
+    return towns
+
+
+def engineers_in_use(towns: list) -> int:
+    """Count engineers working on implementation across all towns."""
+    total = 0
+    for town in towns:
+        state = load_state(town) or {}
+        if state.get("phase") == "implementation":
+            total += len(state.get("engineers", []))
+    return total
+
+
+def wanted_engineers(town: Town, task_id: str, forecast_mode: str = "flag") -> int:
+    """Engineers a town's current task asks for (history estimate or subtasks).
+
+    The task is forecast for file overlaps first if it has not been yet.
+    """
+    tasks = load_tasks(town) or {}
+    task = next((t for t in tasks.get("tasks", []) if t["id"] == task_id), None)
+    if task is None or not task.get("subtasks"):
+        return 0
+    if "forecast" not in task:
+        apply_forecast(task_id, forecast_mode, town=town)
+        task = next(t for t in load_tasks(town)["tasks"] if t["id"] == task_id)
+
+    units = len(task.get("groups") or task.get("subtasks", []))
+    estimate = recommend(units, town=town)
+    return estimate["engineers"] if estimate else units
+
+
+def supervise_step(towns: list, capacity: int, forecast_mode: str = "flag") -> int:
+    """Advance every town by one step. Returns engineers in use afterwards."""
+    in_use = engineers_in_use(towns)
+
+    for town in towns:
+        state = load_state(town)
+        if not state:
+            continue
+        phase = state.get("phase", "idle")
+
+        if phase == "idle":
+            if in_use >= capacity:
+                continue
+            task = get_next_task(town)
+            if task:
+                print(f"Supervisor: [{town.name}] Starting {task['id']}: {task['title']}")
+                start_task(task["id"], town)
+                phase = "planning"
+                state = load_state(town)
+
+        if phase == "planning":
+            task_id = state.get("current_task")
+            wanted = wanted_engineers(town, task_id, forecast_mode)
+            if wanted < 1:
+                # Nothing to spawn; free the town rather than plan forever.
+                print(
+                    f"Supervisor: [{town.name}] Task {task_id} has no subtasks. "
+                    "Skipping."
+                )
+                with locked_state(town) as state:
+                    state.update(phase="idle", current_task=None)
+                continue
+            free = capacity - in_use
+            if free < 1:
+                continue
+            count = min(wanted, free)
+            print(
+                f"Supervisor: [{town.name}] Spawning {count} engineers "
+                f"({in_use + count}/{capacity} in use)"
+            )
+            spawn_engineers(count, town)
+            in_use += count
+
+        elif phase == "implementation":
+            if monitor_step(town):
+                print(f"Supervisor: [{town.name}] Ready for QA")
+                in_use = engineers_in_use(towns)
+
+    return in_use
+
+
+def supervise(
+    towns: list, capacity: int, interval: float = 30, forecast_mode: str = "flag"
+) -> None:
+    """Schedule all towns until interrupted."""
+    for town in towns:
+        if not town.path.exists():
+            print(f"Supervisor: [{town.name}] Not initialized; run 'ot init' there.")
+    print(
+        f"Supervisor: Watching {len(towns)} projects with capacity for "
+        f"{capacity} engineers"
+    )
+    while True:
+        supervise_step(towns, capacity, forecast_mode)
+        time.sleep(interval)
@@ -22,7 +22,9 @@ def attach_session(name: str) -> None:
 
 def kill_session(name: str) -> bool:
     """Kill a tmux session."""
-    result = subprocess.run(["tmux", "kill-session", "-t", name], capture_output=True)
+    result = subprocess.run(
+        ["tmux", "kill-session", "-t", f"={name}"], capture_output=True
+    )
     return result.returncode == 0
 
 
@@ -41,12 +43,54 @@ def list_sessions() -> list:
     return [s for s in sessions if s.startswith("ot-")]
 
 
+def session_paths() -> dict:
+    """Map OpenTown session names to their start directories."""
+    result = subprocess.run(
+        ["tmux", "list-sessions", "-F", "#{session_name}\t#{session_path}"],
+        capture_output=True,
+        text=True,
+    )
+
+    if result.returncode != 0:
+        return {}
+
+    paths = {}
+    for line in result.stdout.strip().split("\n"):
+        name, _, path = line.partition("\t")
+        if name.startswith("ot-"):
+            paths[name] = path
+    return paths
+
+
+def sessions_under(directory: Path) -> list:
+    """List OpenTown sessions started inside directory."""
+    directory = Path(directory).resolve()
+    return [
+        name
+        for name, path in session_paths().items()
+        if path and Path(path).resolve().is_relative_to(directory)
+    ]
+
+
 def send_command(session: str, command: str) -> None:
     """Send a command to a tmux session."""
     os.system(f"tmux send-keys -t {session} '{command}' Enter")
 
 
+def pipe_pane(session: str, command: str) -> bool:
+    """Pipe a session's pane output to a shell command.
+
+    Any existing pipe is replaced (no -o, which would toggle it off).
+    """
+    result = subprocess.run(
+        ["tmux", "pipe-pane", "-t", f"={session}:", command], capture_output=True
+    )
+    return result.returncode == 0
+
+
 def session_exists(name: str) -> bool:
     """Check if a tmux session exists."""
-    result = subprocess.run(["tmux", "has-session", "-t", name], capture_output=True)
+    result = subprocess.run(
+        ["tmux", "has-session", "-t", f"={name}"], capture_output=True
+    )
     return result.returncode == 0
@@ -0,0 +1,201 @@
+"""Worker agent - runs engineer jobs from a broker on this machine.
+
+A worker keeps a bare mirror of the shared repo in its workdir, checks
+each claimed job's branch out into a worktree, runs the agent command with
+the job's prompt as its last argument, then pushes the branch back and
+reports the result. Several workers may share a workdir.
+"""
+
+import fcntl
+import json
+import multiprocessing
+import os
+import shlex
+import shutil
+import socket
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+from .git import run_git, rev_parse
+
+DEFAULT_COMMAND = "opencode run"
+
+
+class LeaseLost(Exception):
+    """The broker gave the job to another worker."""
+
+
+def call(broker: str, path: str, payload: dict) -> Optional[dict]:
+    """POST JSON to the broker. Returns the reply, or None for 204."""
+    request = urllib.request.Request(
+        broker.rstrip("/") + path,
+        data=json.dumps(payload).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            if response.status == 204:
+                return None
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        if e.code == 409:
+            raise LeaseLost(payload.get("job"))
+        raise
+
+
+@contextmanager
+def mirror_lock(workdir: Path):
+    """Serialize mirror updates between workers sharing a workdir."""
+    with open(workdir / "mirror.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield workdir / "mirror.git"
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def checkout(job: dict, workdir: Path, worker: str) -> Path:
+    """Check the job's branch out of the shared repo into a fresh worktree."""
+    branch = job["branch"]
+    path = workdir / "jobs" / f"{worker}-{job['id']}"
+
+    with mirror_lock(workdir) as mirror:
+        if not mirror.exists():
+            run_git("clone", "--bare", "-q", job["remote"], str(mirror))
+        run_git(
+            "fetch",
+            "-q",
+            job["remote"],
+            f"+refs/heads/{branch}:refs/heads/{branch}",
+            cwd=mirror,
+        )
+        if path.exists():
+            run_git("worktree", "remove", "--force", str(path), cwd=mirror)
+            shutil.rmtree(path, ignore_errors=True)
+        run_git("worktree", "prune", cwd=mirror)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        added = run_git(
+            "worktree", "add", "-q", "--force", str(path), branch, cwd=mirror
+        )
+    if added.returncode != 0:
+        raise RuntimeError(f"Could not check out {branch}: {added.stderr.strip()}")
+    return path
+
+
+def keep_lease(
+    broker: str, job: dict, worker: str, stop: threading.Event, lost: threading.Event
+) -> None:
+    """Send heartbeats until stopped; flag the lease as lost on 409."""
+    interval = job.get("lease_ttl", 120) / 3
+    while not stop.wait(interval):
+        try:
+            call(broker, "/heartbeat", {"job": job["id"], "worker": worker})
+        except LeaseLost:
+            lost.set()
+            return
+        except OSError:
+            pass
+
+
+def run_job(broker: str, job: dict, workdir: Path, command: str, worker: str) -> str:
+    """Run one job end to end. Returns the reported status."""
+    stop = threading.Event()
+    lost = threading.Event()
+    threading.Thread(
+        target=keep_lease, args=(broker, job, worker, stop, lost), daemon=True
+    ).start()
+
+    path = None
+    status, sha = "failed", None
+    try:
+        path = checkout(job, workdir, worker)
+        env = {
+            **os.environ,
+            "OT_ENGINEER": job["engineer"],
+            "OT_BRANCH": job["branch"],
+            "OT_PROMPT": job["prompt"],
+        }
+        result = subprocess.run(
+            shlex.split(command) + [job["prompt"]], cwd=path, env=env
+        )
+        if result.returncode == 0 and not lost.is_set():
+            refspec = f"HEAD:refs/heads/{job['branch']}"
+            pushed = run_git("push", "-q", "-f", "origin", refspec, cwd=path)
+            if pushed.returncode == 0:
+                status, sha = "done", rev_parse("HEAD", cwd=path)
+    except (OSError, RuntimeError) as e:
+        print(f"Worker {worker}: {job['id']} failed: {e}")
+    finally:
+        stop.set()
+        if path is not None:
+            with mirror_lock(workdir) as mirror:
+                run_git("worktree", "remove", "--force", str(path), cwd=mirror)
+
+    if lost.is_set():
+        print(f"Worker {worker}: lease on {job['id']} lost; dropping result")
+        return "lost"
+    try:
+        call(
+            broker,
+            "/finish",
+            {"job": job["id"], "worker": worker, "status": status, "sha": sha},
+        )
+    except LeaseLost:
+        return "lost"
+    return status
+
+
+def work(
+    broker: str,
+    workdir: Path,
+    command: str = DEFAULT_COMMAND,
+    name: str = None,
+    poll: float = 5.0,
+    once: bool = False,
+) -> int:
+    """Claim and run jobs until interrupted. Returns the number of jobs run.
+
+    With once set, the worker exits as soon as the queue is empty.
+    """
+    workdir = Path(workdir).resolve()
+    workdir.mkdir(parents=True, exist_ok=True)
+    worker = name or f"{socket.gethostname()}-{os.getpid()}"
+    count = 0
+
+    while True:
+        try:
+            job = call(broker, "/claim", {"worker": worker})
+        except OSError as e:
+            print(f"Worker {worker}: broker unreachable ({e}); retrying")
+            job = None
+        if job is None:
+            if once:
+                return count
+            time.sleep(poll)
+            continue
+
+        print(f"Worker {worker}: running {job['id']} on {job['branch']}")
+        status = run_job(broker, job, workdir, command, worker)
+        print(f"Worker {worker}: {job['id']} {status}")
+        count += 1
+
+
+def start_workers(count: int, broker: str, workdir: Path, **options) -> list:
+    """Start count worker processes standing in for separate machines."""
+    processes = []
+    for i in range(count):
+        process = multiprocessing.Process(
+            target=work,
+            args=(broker, Path(workdir)),
+            kwargs={**options, "name": f"{socket.gethostname()}-w{i + 1}"},
+            daemon=True,
+        )
+        process.start()
+        processes.append(process)
+    return processes